@@ -10,9 +10,13 @@ logger = logging.getLogger(__name__)
 
 
 class AsyncPgVector(ExtendedPgVector):
+    # pgvector operators for langchain's DistanceStrategy values
+    _DISTANCE_OPERATORS = {"l2": "<->", "cosine": "<=>", "inner": "<#>"}
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._thread_pool = None
+        self._native_search = None
 
     def _get_thread_pool(self):
         if self._thread_pool is None:
@@ -27,6 +31,34 @@ class AsyncPgVector(ExtendedPgVector):
                 pass
         return self._thread_pool
 
+    def _native_search_enabled(self) -> bool:
+        """Read NATIVE_VECTOR_SEARCH lazily (app.config imports this module)"""
+        if self._native_search is None:
+            from app.config import NATIVE_VECTOR_SEARCH
+            self._native_search = NATIVE_VECTOR_SEARCH
+        return self._native_search
+
+    def get_distance_operator(self) -> str:
+        strategy = getattr(self, "_distance_strategy", None)
+        return self._DISTANCE_OPERATORS.get(getattr(strategy, "value", strategy), "<=>")
+
+    async def _anative_similarity_search(
+        self,
+        embedding: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]]
+    ) -> List[Tuple[Document, float]]:
+        """Run the KNN query on the shared asyncpg pool instead of the thread pool"""
+        from app.services.hybrid_search import hybrid_search_service
+
+        return await hybrid_search_service.vector_search(
+            embedding,
+            k=k,
+            filter_dict=filter,
+            collection_name=self.collection_name,
+            distance_operator=self.get_distance_operator()
+        )
+
     def _convert_filter_to_pgvector(self, filter: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
         """
         Convert MongoDB-style filters to PGVector-compatible format.
@@ -79,17 +111,35 @@ class AsyncPgVector(ExtendedPgVector):
         """
         Async version of similarity_search_with_score_by_vector with improved filter handling.
         """
+        if self._native_search_enabled():
+            from app.services.hybrid_search import hybrid_search_service
+
+            if hybrid_search_service.supports_filter(filter):
+                return await self._anative_similarity_search(embedding, k, filter)
+
         executor = executor or self._get_thread_pool()
 
         # Check if we have a complex filter with $in operator
         if filter and any(isinstance(v, dict) and "$in" in v for v in filter.values()):
-            # Handle $in operator specially
+            from app.services.hybrid_search import hybrid_search_service
+
+            if hybrid_search_service.supports_filter(filter):
+                # Single statement with = ANY($n): Postgres returns the global top-k
+                return await self._anative_similarity_search(embedding, k, filter)
+
+            # Fallback: handle $in operator with one query per value
             all_results = []
 
             for key, value in filter.items():
                 if isinstance(value, dict) and "$in" in value:
                     # Run multiple queries, one for each value in the $in list
                     file_ids = value["$in"]
+                    if key == "file_id":
+                        # Each query covers one file, so skipping tombstoned files keeps top-k exact
+                        tombstoned = await hybrid_search_service.tombstoned_file_ids(
+                            file_ids, self.collection_name
+                        )
+                        file_ids = [file_id for file_id in file_ids if file_id not in tombstoned]
 
                     if not file_ids:
                         return []
@@ -123,6 +173,10 @@ class AsyncPgVector(ExtendedPgVector):
                         all_results.extend(results)
 
                     # Sort by score (distance) and take top k
+                    if key != "file_id":
+                        all_results = await hybrid_search_service.drop_tombstoned(
+                            all_results, self.collection_name
+                        )
                     all_results.sort(key=lambda x: x[1])
 
                     # Ensure unique documents (in case of duplicates)
@@ -140,14 +194,33 @@ class AsyncPgVector(ExtendedPgVector):
 
                     return unique_results[:k]
 
-        # For simple filters, use the parent implementation
-        results = await run_in_executor(
-            executor,
-            super().similarity_search_with_score_by_vector,
-            embedding,
-            k,
-            filter
-        )
+        from app.services.hybrid_search import hybrid_search_service
+
+        file_id = (filter or {}).get("file_id")
+        if isinstance(file_id, dict):
+            file_id = file_id.get("$eq")
+        if isinstance(file_id, str) and await hybrid_search_service.tombstoned_file_ids(
+            [file_id], self.collection_name
+        ):
+            # Every row the filter matches would be dropped below
+            return []
+
+        # For simple filters, use the parent implementation. Tombstoned files
+        # can only be dropped afterwards, so fetch more until k remain.
+        fetch_k = k
+        while True:
+            fetched = await run_in_executor(
+                executor,
+                super().similarity_search_with_score_by_vector,
+                embedding,
+                fetch_k,
+                filter
+            )
+            results = await hybrid_search_service.drop_tombstoned(fetched, self.collection_name)
+            if len(results) >= k or len(fetched) < fetch_k or fetch_k >= k * 16:
+                break
+            fetch_k *= 2
+        results = results[:k]
 
         # Ensure consistent IDs in metadata
         for doc, score in results:
@@ -0,0 +1,143 @@
+# app/services/cache_invalidation.py
+import asyncio
+import json
+import logging
+import uuid
+from typing import Awaitable, Callable, List, Optional
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7500
+
+
+class CacheInvalidationBus:
+    """
+    Broadcast file cache invalidations to every API worker with LISTEN/NOTIFY.
+
+    publish() applies an invalidation locally and notifies the other
+    processes, each of which holds one listening connection. Notifications
+    sent while a listener is disconnected are lost, so `on_reset` (drop all
+    cached entries) runs every time the listener (re)connects.
+    """
+
+    def __init__(
+        self,
+        dsn_getter: Callable[[], str],
+        pool_getter: Callable[[], Awaitable],
+        on_invalidate: Callable[[List[str]], None],
+        on_reset: Callable[[], None],
+        channel: str = "rag_file_cache_invalidation",
+        check_interval: float = 30.0,
+        retry_delay: float = 5.0
+    ):
+        self._dsn_getter = dsn_getter
+        self._pool_getter = pool_getter
+        self._on_invalidate = on_invalidate
+        self._on_reset = on_reset
+        self.channel = channel
+        self.check_interval = check_interval
+        self.retry_delay = retry_delay
+        self.sender = uuid.uuid4().hex
+
+        self._task: Optional[asyncio.Task] = None
+        # In-flight NOTIFY sends; referenced so they are not garbage collected
+        self._sending = set()
+        self.connected = False
+
+        self.published = 0
+        self.received = 0
+        self.resets = 0
+        self.errors = 0
+
+    def start(self):
+        """Start listening in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._listen())
+
+    def stop(self):
+        """Stop listening; publish() then only invalidates locally"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def publish(self, file_ids: List[str]):
+        """Invalidate the files here, and in the other workers once notified"""
+        file_ids = list(file_ids)
+        if not file_ids:
+            return
+        self._on_invalidate(file_ids)
+        if self._task is not None:
+            task = asyncio.ensure_future(self._notify(file_ids))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    def _payloads(self, file_ids: List[str]):
+        batch: List[str] = []
+        for file_id in file_ids:
+            candidate = batch + [file_id]
+            payload = json.dumps({"sender": self.sender, "file_ids": candidate})
+            if batch and len(payload.encode("utf-8")) > MAX_PAYLOAD_BYTES:
+                yield json.dumps({"sender": self.sender, "file_ids": batch})
+                batch = [file_id]
+            else:
+                batch = candidate
+        if batch:
+            yield json.dumps({"sender": self.sender, "file_ids": batch})
+
+    async def _notify(self, file_ids: List[str]):
+        try:
+            pool = await self._pool_getter()
+            async with pool.acquire() as conn:
+                for payload in self._payloads(file_ids):
+                    await conn.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+            self.published += 1
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to broadcast cache invalidation for {file_ids}: {e}")
+
+    def _on_notification(self, connection, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+        except json.JSONDecodeError:
+            return
+        if message.get("sender") == self.sender:
+            return
+        self.received += 1
+        self._on_invalidate(message.get("file_ids") or [])
+
+    async def _listen(self):
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self._dsn_getter())
+                await conn.add_listener(self.channel, self._on_notification)
+                self.connected = True
+                # Anything published while not listening was missed
+                self.resets += 1
+                self._on_reset()
+                while not conn.is_closed():
+                    await asyncio.sleep(self.check_interval)
+                    await conn.fetchval("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Cache invalidation listener disconnected: {e}")
+            finally:
+                self.connected = False
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(self.retry_delay)
+
+    def stats(self):
+        """Return listener state and counters"""
+        return {
+            'connected': self.connected,
+            'published': self.published,
+            'received': self.received,
+            'resets': self.resets,
+            'errors': self.errors,
+        }
@@ -302,12 +302,78 @@ elif EMBEDDINGS_PROVIDER == EmbeddingsProvider.BEDROCK:
 else:
     raise ValueError(f"Unsupported embeddings provider: {EMBEDDINGS_PROVIDER}")
 
-embeddings = init_embeddings(EMBEDDINGS_PROVIDER, EMBEDDINGS_MODEL)
+# Set in document processing pool workers (see app/services/document_processing.py).
+# They import this module only for loader settings, so they skip loading the
+# embeddings model and opening the vector store.
+DOCUMENT_WORKER = os.getenv("RAG_DOCUMENT_WORKER") == "1"
+
+embeddings = None if DOCUMENT_WORKER else init_embeddings(EMBEDDINGS_PROVIDER, EMBEDDINGS_MODEL)
+
+# Threads for query embeddings when the provider has no native aembed_query
+QUERY_EMBEDDING_THREADS = int(get_env_variable("QUERY_EMBEDDING_THREADS", "4"))
+
+# Query embedding cache: entry count, byte budget (float32 storage) and TTL in seconds (0 = no expiry)
+QUERY_EMBEDDING_CACHE_MAX_ENTRIES = int(get_env_variable("QUERY_EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+QUERY_EMBEDDING_CACHE_MAX_BYTES = int(get_env_variable("QUERY_EMBEDDING_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+QUERY_EMBEDDING_CACHE_TTL = float(get_env_variable("QUERY_EMBEDDING_CACHE_TTL", "86400"))
+# Second cache tier shared across workers and restarts: "none" or "postgres"
+QUERY_EMBEDDING_CACHE_PERSIST = get_env_variable("QUERY_EMBEDDING_CACHE_PERSIST", "none").lower()
+
+# Coalesce concurrent query embeddings into batched calls (0 disables batching)
+QUERY_EMBEDDING_BATCH_WINDOW_MS = float(get_env_variable("QUERY_EMBEDDING_BATCH_WINDOW_MS", "0"))
+QUERY_EMBEDDING_BATCH_MAX_SIZE = int(get_env_variable("QUERY_EMBEDDING_BATCH_MAX_SIZE", "64"))
+
+# Per-file query result cache (0 entries disables it); TTL bounds staleness across workers
+QUERY_RESULT_CACHE_MAX_ENTRIES = int(get_env_variable("QUERY_RESULT_CACHE_MAX_ENTRIES", "10000"))
+QUERY_RESULT_CACHE_TTL = float(get_env_variable("QUERY_RESULT_CACHE_TTL", "300"))
+# Compressed /documents/{id}/context text per file_id (0 entries disables it)
+DOCUMENT_CONTEXT_CACHE_MAX_ENTRIES = int(get_env_variable("DOCUMENT_CONTEXT_CACHE_MAX_ENTRIES", "1000"))
+DOCUMENT_CONTEXT_CACHE_TTL = float(get_env_variable("DOCUMENT_CONTEXT_CACHE_TTL", "300"))
+# Broadcast cache invalidations to the other API workers over Postgres LISTEN/NOTIFY;
+# without it, other workers may serve deleted/re-embedded files until the TTLs expire
+CACHE_INVALIDATION_NOTIFY = get_env_variable("CACHE_INVALIDATION_NOTIFY", "true").lower() == "true"
+
+# Ingest: write embedding, document, search_text and metadata in one insert per row
+SINGLE_PASS_INGEST = get_env_variable("SINGLE_PASS_INGEST", "false").lower() == "true"
+# Chunks per embed/insert batch, and batches buffered between pipeline stages
+INGEST_BATCH_SIZE = int(get_env_variable("INGEST_BATCH_SIZE", "200"))
+INGEST_QUEUE_DEPTH = int(get_env_variable("INGEST_QUEUE_DEPTH", "2"))
+# Ingest embedding batches in flight per process (0 = provider default) and 429 retries
+INGEST_EMBED_CONCURRENCY = int(get_env_variable("INGEST_EMBED_CONCURRENCY", "0"))
+INGEST_EMBED_MAX_RETRIES = int(get_env_variable("INGEST_EMBED_MAX_RETRIES", "5"))
+# Batch ingest: files loaded in parallel, and chunks committed per transaction
+INGEST_BATCH_FILE_CONCURRENCY = int(get_env_variable("INGEST_BATCH_FILE_CONCURRENCY", "4"))
+INGEST_BATCH_TRANSACTION_CHUNKS = int(get_env_variable("INGEST_BATCH_TRANSACTION_CHUNKS", "5000"))
+INGEST_BATCH_MAX_FILES = int(get_env_variable("INGEST_BATCH_MAX_FILES", "100"))
+# Ingests writing at once. Each holds one hybrid pool connection in a transaction for
+# its whole embedding run (429 backoffs included); 0 = half of HYBRID_POOL_MAX_SIZE,
+# so searches always keep the other half
+INGEST_MAX_WRITERS = int(get_env_variable("INGEST_MAX_WRITERS", "0"))
+# Uploads up to this many bytes are kept in memory instead of a temp file
+UPLOAD_MEMORY_LIMIT = int(get_env_variable("UPLOAD_MEMORY_LIMIT", str(8 * 1024 * 1024)))
+# Skip parsing/embedding of byte-identical files that are already indexed (SHA-256)
+UPLOAD_DEDUP = get_env_variable("UPLOAD_DEDUP", "true").lower() == "true"
+# Async ingest jobs (async_mode=true): workers per process and backlog limit before 503
+INGEST_JOB_WORKERS = int(get_env_variable("INGEST_JOB_WORKERS", "2"))
+INGEST_JOB_MAX_DEPTH = int(get_env_variable("INGEST_JOB_MAX_DEPTH", "100"))
+# Worker processes for parsing, cleaning and splitting uploads (0 = use the thread pool)
+INGEST_PROCESS_WORKERS = int(get_env_variable("INGEST_PROCESS_WORKERS", "0"))
+# Reuse stored vectors for chunks whose digest was already embedded with the same model
+INGEST_REUSE_EMBEDDINGS = get_env_variable("INGEST_REUSE_EMBEDDINGS", "true").lower() == "true"
+# Deletes only tombstone files; a background worker purges their rows in batches
+SOFT_DELETE = get_env_variable("SOFT_DELETE", "false").lower() == "true"
+TOMBSTONE_PURGE_INTERVAL = float(get_env_variable("TOMBSTONE_PURGE_INTERVAL", "30"))
+TOMBSTONE_PURGE_BATCH_SIZE = int(get_env_variable("TOMBSTONE_PURGE_BATCH_SIZE", "5000"))
+# Purged rows before VACUUM (ANALYZE) / REINDEX of idx_search_vector (0 disables)
+TOMBSTONE_VACUUM_THRESHOLD = int(get_env_variable("TOMBSTONE_VACUUM_THRESHOLD", "10000"))
+TOMBSTONE_REINDEX_THRESHOLD = int(get_env_variable("TOMBSTONE_REINDEX_THRESHOLD", "0"))
 
 logger.info(f"Initialized embeddings of type: {type(embeddings)}")
 
 # Vector store
-if VECTOR_DB_TYPE == VectorDBType.PGVECTOR:
+if DOCUMENT_WORKER:
+    vector_store = None
+elif VECTOR_DB_TYPE == VectorDBType.PGVECTOR:
     vector_store = get_vector_store(
         connection_string=CONNECTION_STRING,
         embeddings=embeddings,
@@ -332,7 +398,7 @@ elif VECTOR_DB_TYPE == VectorDBType.ATLAS_MONGO:
 else:
     raise ValueError(f"Unsupported vector store type: {VECTOR_DB_TYPE}")
 
-retriever = vector_store.as_retriever()
+retriever = vector_store.as_retriever() if vector_store is not None else None
 
 known_source_ext = [
     "go",
@@ -402,8 +468,24 @@ HYBRID_SEARCH_TIMEOUT = int(get_env_variable("HYBRID_SEARCH_TIMEOUT", "30"))
 # Pool Configuration
 HYBRID_POOL_MIN_SIZE = int(get_env_variable("HYBRID_POOL_MIN_SIZE", "2"))
 HYBRID_POOL_MAX_SIZE = int(get_env_variable("HYBRID_POOL_MAX_SIZE", "10"))
+# Client timeout (seconds) for index builds, VACUUM and REINDEX; pool queries use 60s
+HYBRID_MAINTENANCE_TIMEOUT = float(get_env_variable("HYBRID_MAINTENANCE_TIMEOUT", "86400"))
+
+# Rows per batch for the background search_text backfill
+HYBRID_BACKFILL_BATCH_SIZE = int(get_env_variable("HYBRID_BACKFILL_BATCH_SIZE", "5000"))
+
+# Run semantic KNN queries on the asyncpg pool instead of the SQLAlchemy thread pool
+NATIVE_VECTOR_SEARCH = get_env_variable("NATIVE_VECTOR_SEARCH", "false").lower() == "true"
+
+# Run hybrid search (KNN + ts_rank_cd + RRF) as a single SQL statement
+HYBRID_SQL_FUSION = get_env_variable("HYBRID_SQL_FUSION", "false").lower() == "true"
+
+# BM25 diagnostics: fraction of searches sampled (0.0-1.0), or forced per request via header
+HYBRID_DIAGNOSTICS_SAMPLE_RATE = float(get_env_variable("HYBRID_DIAGNOSTICS_SAMPLE_RATE", "0.0"))
+HYBRID_DIAGNOSTICS_HEADER = get_env_variable("HYBRID_DIAGNOSTICS_HEADER", "X-Search-Diagnostics")
 
 logger.info(f"Hybrid search enabled: {ENABLE_HYBRID_SEARCH}")
+logger.info(f"Native vector search enabled: {NATIVE_VECTOR_SEARCH}")
 if ENABLE_HYBRID_SEARCH:
 
     logger.info("=" * 50)
@@ -415,6 +497,8 @@ if ENABLE_HYBRID_SEARCH:
     logger.info(f"Fusion K: {HYBRID_FUSION_K}")
     logger.info(f"Expansion factor: {HYBRID_EXPANSION_FACTOR}")
     logger.info(f"Timeout: {HYBRID_SEARCH_TIMEOUT}s")
+    logger.info(f"SQL fusion: {HYBRID_SQL_FUSION}")
+    logger.info(f"Diagnostics sample rate: {HYBRID_DIAGNOSTICS_SAMPLE_RATE}")
     logger.info("=" * 50)
     logger.info(f"Default search type: {DEFAULT_SEARCH_TYPE}")
     logger.info(f"Default semantic weight: {DEFAULT_SEMANTIC_WEIGHT}")
@@ -0,0 +1,112 @@
+# app/services/document_processing.py
+"""
+CPU-bound document parsing, cleaning and splitting for a process pool.
+
+This module is imported by the pool's worker processes, so app modules are
+imported inside the worker function rather than at module level. Results
+are returned as plain tuples to keep pickling cheap.
+
+The document loader (and, with spawn, the app's main module) imports
+app.config in every worker. Workers are spawned with RAG_DOCUMENT_WORKER=1
+in their environment, which makes app.config skip the embeddings model and
+the vector store, so a worker costs the loader libraries but not a second
+model or DB engine. The variable is set only while a worker is being
+spawned (see _DocumentWorkerProcess); the API process keeps its environment.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.context import SpawnContext, SpawnProcess
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WORKER_ENV_FLAG = "RAG_DOCUMENT_WORKER"
+_spawn_lock = threading.Lock()
+
+# (page_content, metadata)
+ChunkTuple = Tuple[str, Dict]
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def load_clean_and_split(
+    filename: str,
+    content_type: str,
+    file_path: str,
+    chunk_size: int,
+    chunk_overlap: int
+) -> Tuple[str, str, List[ChunkTuple]]:
+    """
+    Load a file, split it into chunks and clean PDF chunks.
+    Returns (known_type, file_ext, [(page_content, metadata), ...]).
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from app.utils.document_loader import (
+        get_loader,
+        clean_text,
+        cleanup_temp_encoding_file,
+    )
+
+    loader, known_type, file_ext = get_loader(filename, content_type, file_path)
+    try:
+        data = loader.load()
+    finally:
+        cleanup_temp_encoding_file(loader)
+
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    clean = file_ext == "pdf"
+    chunks = [
+        (clean_text(doc.page_content) if clean else doc.page_content, doc.metadata or {})
+        for doc in text_splitter.split_documents(data)
+    ]
+    return known_type, file_ext, chunks
+
+
+class _DocumentWorkerProcess(SpawnProcess):
+    """Spawn process whose child starts with WORKER_ENV_FLAG=1 in its environment"""
+
+    def start(self):
+        # The child copies os.environ when it is spawned, inside start();
+        # the executor may spawn workers later and from its own thread
+        with _spawn_lock:
+            previous = os.environ.get(WORKER_ENV_FLAG)
+            os.environ[WORKER_ENV_FLAG] = "1"
+            try:
+                super().start()
+            finally:
+                if previous is None:
+                    del os.environ[WORKER_ENV_FLAG]
+                else:
+                    os.environ[WORKER_ENV_FLAG] = previous
+
+
+class _DocumentWorkerContext(SpawnContext):
+    Process = _DocumentWorkerProcess
+
+
+def get_process_pool(max_workers: int) -> Optional[ProcessPoolExecutor]:
+    """Shared process pool (spawn context), or None when max_workers is 0"""
+    global _process_pool
+    if max_workers <= 0:
+        return None
+    if _process_pool is None:
+        # spawn: forking a process with a running event loop and open
+        # connections is unsafe
+        _process_pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=_DocumentWorkerContext(),
+        )
+        logger.info(f"Started document processing pool with {max_workers} workers")
+    return _process_pool
+
+
+def shutdown_process_pool():
+    """Stop the shared process pool, if it was started"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
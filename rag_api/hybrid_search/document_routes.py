@@ -7,9 +7,11 @@ import aiofiles
 import aiofiles.os
 import uuid
 import json
+import zlib
+from collections import deque
 from datetime import datetime
-from shutil import copyfileobj
-from typing import List, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Iterable, Optional
 from fastapi import (
     APIRouter,
     Request,
@@ -21,7 +23,10 @@ from fastapi import (
     Query,
     status,
 )
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.runnables import run_in_executor
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from functools import lru_cache
@@ -38,11 +43,44 @@ from app.config import (
     HYBRID_FUSION_K,
     HYBRID_EXPANSION_FACTOR,
     HYBRID_MAX_RETRIES,
-    HYBRID_SEARCH_TIMEOUT
+    HYBRID_SEARCH_TIMEOUT,
+    HYBRID_SQL_FUSION,
+    HYBRID_DIAGNOSTICS_HEADER,
+    QUERY_EMBEDDING_THREADS,
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+    QUERY_EMBEDDING_CACHE_MAX_BYTES,
+    QUERY_EMBEDDING_CACHE_TTL,
+    QUERY_EMBEDDING_CACHE_PERSIST,
+    QUERY_EMBEDDING_BATCH_WINDOW_MS,
+    QUERY_EMBEDDING_BATCH_MAX_SIZE,
+    EMBEDDINGS_PROVIDER,
+    EMBEDDINGS_MODEL,
+    EmbeddingsProvider,
+    QUERY_RESULT_CACHE_MAX_ENTRIES,
+    QUERY_RESULT_CACHE_TTL,
+    DOCUMENT_CONTEXT_CACHE_MAX_ENTRIES,
+    DOCUMENT_CONTEXT_CACHE_TTL,
+    CACHE_INVALIDATION_NOTIFY,
+    SINGLE_PASS_INGEST,
+    INGEST_BATCH_SIZE,
+    INGEST_QUEUE_DEPTH,
+    INGEST_EMBED_CONCURRENCY,
+    INGEST_EMBED_MAX_RETRIES,
+    INGEST_REUSE_EMBEDDINGS,
+    INGEST_BATCH_FILE_CONCURRENCY,
+    INGEST_BATCH_TRANSACTION_CHUNKS,
+    INGEST_BATCH_MAX_FILES,
+    INGEST_PROCESS_WORKERS,
+    INGEST_JOB_WORKERS,
+    INGEST_JOB_MAX_DEPTH,
+    UPLOAD_MEMORY_LIMIT,
+    UPLOAD_DEDUP,
+    SOFT_DELETE
 )
 from app.constants import ERROR_MESSAGES
 from app.models import (
     StoreDocument,
+    StoreDocumentBatch,
     QueryRequestBody,
     DocumentResponse,
     QueryMultipleBody,
@@ -51,6 +89,25 @@ from app.models import (
 from app.services.vector_store.async_pg_vector import AsyncPgVector
 # IMPORTANTE: Importar la instancia, no la clase
 from app.services.hybrid_search import hybrid_search_service
+from app.services.embedding_cache import (
+    QueryEmbeddingCache,
+    PostgresEmbeddingStore,
+    QueryEmbeddingBatcher,
+)
+from app.services.file_cache import FileScopedCache
+from app.services.cache_invalidation import CacheInvalidationBus
+from app.services.document_processing import (
+    get_process_pool,
+    load_clean_and_split,
+    shutdown_process_pool,
+)
+from app.services.ingest_jobs import IngestJobQueue, IngestQueueFull
+from app.services.upload_stream import ReceivedUpload, hash_file, receive_upload
+from app.services.ingest_pipeline import (
+    AdaptiveEmbedder,
+    DigestReuseEmbedder,
+    IngestPipeline,
+)
 from app.utils.document_loader import (
     get_loader,
     clean_text,
@@ -124,10 +181,17 @@ async def startup_event():
             logger.error(f"Traceback: {traceback.format_exc()}")
             # Don't fail startup, hybrid search will try lazy initialization
 
+    if CACHE_INVALIDATION_NOTIFY and isinstance(vector_store, AsyncPgVector):
+        cache_invalidation.start()
+
 
 @router.on_event("shutdown")
 async def shutdown_event():
     """Cleanup resources on shutdown"""
+    cache_invalidation.stop()
+    shutdown_process_pool()
+    if _query_embedding_executor is not None:
+        _query_embedding_executor.shutdown(wait=False)
     try:
         await hybrid_search_service.cleanup()
         logger.info("Hybrid search service cleaned up")
@@ -163,15 +227,14 @@ async def save_upload_file_async(file: UploadFile, temp_file_path: str) -> None:
         )
 
 
-def save_upload_file_sync(file: UploadFile, temp_file_path: str) -> None:
-    """Save uploaded file synchronously."""
+async def receive_upload_file(file: UploadFile, directory: str) -> ReceivedUpload:
+    """Read an upload once, hashing it; small bodies stay in memory."""
     try:
-        with open(temp_file_path, "wb") as temp_file:
-            copyfileobj(file.file, temp_file)
+        return await receive_upload(file, directory, UPLOAD_MEMORY_LIMIT)
     except Exception as e:
         logger.error(
-            "Failed to save uploaded file | Path: %s | Error: %s | Traceback: %s",
-            temp_file_path,
+            "Failed to receive uploaded file | File: %s | Error: %s | Traceback: %s",
+            file.filename,
             str(e),
             traceback.format_exc(),
         )
@@ -194,6 +257,119 @@ async def load_file_content(
     return data, known_type, file_ext
 
 
+async def load_for_ingest(
+    filename: str, content_type: str, file_path: str, executor
+) -> tuple:
+    """
+    Load a file for embedding. With INGEST_PROCESS_WORKERS, parsing, cleaning
+    and splitting run in the process pool and the returned documents are
+    already final chunks (processed=True); otherwise this is load_file_content.
+    Returns (documents, known_type, file_ext, processed).
+    """
+    process_pool = get_process_pool(INGEST_PROCESS_WORKERS)
+    if process_pool is None:
+        data, known_type, file_ext = await load_file_content(
+            filename, content_type, file_path, executor
+        )
+        return data, known_type, file_ext, False
+
+    known_type, file_ext, chunks = await asyncio.get_running_loop().run_in_executor(
+        process_pool,
+        load_clean_and_split,
+        filename,
+        content_type,
+        file_path,
+        CHUNK_SIZE,
+        CHUNK_OVERLAP,
+    )
+    documents = [
+        Document(page_content=content, metadata=metadata) for content, metadata in chunks
+    ]
+    return documents, known_type, file_ext, True
+
+
+# Plain text is decoded straight from memory instead of going through a loader
+DIRECT_TEXT_EXTENSIONS = {"txt"}
+
+
+def _direct_text_documents(upload: ReceivedUpload, source: str):
+    """Documents for an in-memory UTF-8 text upload, or None if a loader is needed"""
+    file_ext = upload.filename.rsplit(".", 1)[-1].lower() if "." in upload.filename else ""
+    if file_ext not in DIRECT_TEXT_EXTENSIONS:
+        return None
+    text = upload.text()
+    if text is None:
+        return None
+    return [Document(page_content=text, metadata={"source": source})], file_ext
+
+
+def _restore_source(documents: List[Document], file_path: str, source: str):
+    """Point `source` metadata at the upload's usual path instead of the spool file"""
+    for doc in documents:
+        if doc.metadata.get("source") == file_path:
+            doc.metadata["source"] = source
+
+
+async def load_upload_for_ingest(
+    upload: ReceivedUpload, content_type: str, source: str, executor
+) -> tuple:
+    """load_for_ingest for a received upload; same return value"""
+    direct = _direct_text_documents(upload, source)
+    if direct is not None:
+        documents, file_ext = direct
+        return documents, True, file_ext, False
+
+    file_path = await upload.to_path()
+    data, known_type, file_ext, processed = await load_for_ingest(
+        upload.filename, content_type, file_path, executor
+    )
+    _restore_source(data, file_path, source)
+    return data, known_type, file_ext, processed
+
+
+async def reuse_identical_upload(
+    sha256: str, file_id: str, user_id: str, source: str, incremental: bool = False
+):
+    """
+    Short-circuit a byte-identical upload that is already indexed: nothing to
+    do if it is this file_id, otherwise copy its chunks (embeddings included)
+    to the new file_id. Returns a message, or None to process the file normally.
+    """
+    if not UPLOAD_DEDUP or not isinstance(vector_store, AsyncPgVector):
+        return None
+    try:
+        hybrid_search_service.ensure_ingest_indexes()
+        source_file_id = await hybrid_search_service.find_file_by_sha256(
+            sha256, EMBEDDING_MODEL_ID, vector_store.collection_name, prefer_file_id=file_id
+        )
+        if source_file_id is None:
+            return None
+        if source_file_id == file_id:
+            logger.info(f"File {file_id} unchanged (sha256 {sha256}), skipping re-embedding")
+            return "File already indexed."
+        if incremental:
+            # Copying would add rows next to the ones being updated
+            return None
+
+        with_search_text = await ensure_hybrid_search_initialized()
+        await hybrid_search_service.purge_file(file_id, vector_store.collection_name)
+        copied = await hybrid_search_service.copy_file_chunks(
+            source_file_id,
+            file_id,
+            user_id,
+            vector_store.collection_name,
+            source,
+            with_search_text=with_search_text,
+        )
+        if not copied:
+            return None
+        invalidate_file_caches([file_id])
+        return f"Identical file already indexed; reused {copied} chunks."
+    except Exception as e:
+        logger.warning(f"Identical upload lookup failed for {file_id}, processing it: {e}")
+        return None
+
+
 def extract_text_from_documents(documents: List[Document], file_ext: str) -> str:
     """Extract text content from loaded documents."""
     text_content = ""
@@ -223,6 +399,12 @@ async def cleanup_temp_file_async(file_path: str) -> None:
         )
 
 
+def diagnostics_requested(request: Request) -> bool:
+    """Whether this search should write BM25 diagnostics to the explain log"""
+    forced = request.headers.get(HYBRID_DIAGNOSTICS_HEADER, "").lower() in ("1", "true", "yes")
+    return hybrid_search_service.should_run_diagnostics(force=forced)
+
+
 async def ensure_hybrid_search_initialized() -> bool:
     """
     Ensure hybrid search is initialized when needed
@@ -243,11 +425,46 @@ async def ensure_hybrid_search_initialized() -> bool:
     return True
 
 
+async def stream_json_array(batches):
+    """Encode batches of JSON-serializable items as one JSON array, batch by batch"""
+    yield "["
+    first = True
+    async for batch in batches:
+        if not batch:
+            continue
+        body = ",".join(json.dumps(item) for item in batch)
+        yield body if first else "," + body
+        first = False
+    yield "]"
+
+
 @router.get("/ids")
-async def get_all_ids(request: Request):
+async def get_all_ids(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    after: Optional[str] = None,
+):
+    """
+    Distinct ids of the collection. With `limit`, returns one page
+    (`{"ids": [...], "next_after": ...}`); pass `next_after` back as `after`
+    for the next page. Without it, the full list is streamed.
+    """
     try:
         if isinstance(vector_store, AsyncPgVector):
-            ids = await vector_store.get_all_ids(executor=request.app.state.thread_pool)
+            hybrid_search_service.ensure_ingest_indexes()
+            if limit is not None:
+                ids = await hybrid_search_service.get_ids_page(
+                    vector_store.collection_name, after or "", limit
+                )
+                return {"ids": ids, "next_after": ids[-1] if len(ids) == limit else None}
+            return StreamingResponse(
+                stream_json_array(hybrid_search_service.iter_ids(vector_store.collection_name)),
+                media_type="application/json",
+            )
+        elif limit is not None:
+            raise HTTPException(
+                status_code=400, detail="Paginated ids need the async pgvector store"
+            )
         else:
             ids = vector_store.get_all_ids()
 
@@ -275,7 +492,8 @@ async def health_check():
             "status": "UP" if await is_health_ok() else "DOWN",
             "hybrid_search": {
                 "enabled": ENABLE_HYBRID_SEARCH,
-                "initialized": hybrid_search_service._initialized if ENABLE_HYBRID_SEARCH else False
+                "initialized": hybrid_search_service._initialized if ENABLE_HYBRID_SEARCH else False,
+                "status": hybrid_search_service.status if ENABLE_HYBRID_SEARCH else "disabled"
             }
         }
 
@@ -300,19 +518,29 @@ async def health_check():
 async def get_documents_by_ids(request: Request, ids: list[str] = Query(...)):
     try:
         if isinstance(vector_store, AsyncPgVector):
-            existing_ids = await vector_store.get_filtered_ids(
-                ids, executor=request.app.state.thread_pool
-            )
-            documents = await vector_store.get_documents_by_ids(
-                ids, executor=request.app.state.thread_pool
+            # One query returns missing ids first, then the documents to stream
+            batches = hybrid_search_service.iter_documents_by_ids(ids, vector_store.collection_name)
+            try:
+                missing = await batches.__anext__()
+            except BaseException:
+                await batches.aclose()
+                raise
+            if missing:
+                await batches.aclose()
+                raise HTTPException(status_code=404, detail=f"One or more IDs not found: {missing}")
+            return StreamingResponse(
+                stream_json_array(batches),
+                media_type="application/json",
+                # Releases the connection if the body is never fully iterated
+                background=BackgroundTask(batches.aclose),
             )
-        else:
-            existing_ids = vector_store.get_filtered_ids(ids)
-            documents = vector_store.get_documents_by_ids(ids)
 
-        # Ensure all requested ids exist
-        if not all(id in existing_ids for id in ids):
-            raise HTTPException(status_code=404, detail="One or more IDs not found")
+        existing_ids = set(vector_store.get_filtered_ids(ids))
+        missing = [id for id in ids if id not in existing_ids]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"One or more IDs not found: {missing}")
+
+        documents = vector_store.get_documents_by_ids(ids)
 
         # Ensure documents list is not empty
         if not documents:
@@ -341,27 +569,29 @@ async def get_documents_by_ids(request: Request, ids: list[str] = Query(...)):
 @router.delete("/documents")
 async def delete_documents(request: Request, document_ids: List[str] = Body(...)):
     try:
-        if isinstance(vector_store, AsyncPgVector):
-            # Find all custom_ids that match the file_id patterns
-            all_custom_ids = []
-            for file_id in document_ids:
-                # Get custom_ids that start with this file_id
-                custom_ids = await get_custom_ids_by_file_id_pattern(
-                    file_id, executor=request.app.state.thread_pool
-                )
-                all_custom_ids.extend(custom_ids)
-            
-            if not all_custom_ids:
+        deleted = None
+        tombstoned = None
+        if SOFT_DELETE and isinstance(vector_store, AsyncPgVector):
+            tombstoned = await hybrid_search_service.tombstone_files(
+                document_ids, vector_store.collection_name
+            )
+            if not tombstoned:
                 raise HTTPException(status_code=404, detail="One or more IDs not found")
-            
-            # Delete using the found custom_ids
-            await vector_store.delete(
-                ids=all_custom_ids, executor=request.app.state.thread_pool
+
+            logger.info(f"Tombstoned {len(tombstoned)} file(s): {tombstoned}")
+
+        elif isinstance(vector_store, AsyncPgVector):
+            hybrid_search_service.ensure_ingest_indexes()
+            deleted = await hybrid_search_service.delete_files(
+                document_ids, vector_store.collection_name
             )
-            
-            deleted_count = len(all_custom_ids)
+
+            deleted_count = sum(deleted.values())
+            if not deleted_count:
+                raise HTTPException(status_code=404, detail="One or more IDs not found")
+
             logger.info(f"Deleted {deleted_count} chunks for {len(document_ids)} file(s): {document_ids}")
-            
+
         else:
             # For non-async vector stores, try original method first
             existing_ids = vector_store.get_filtered_ids(document_ids)
@@ -369,10 +599,17 @@ async def delete_documents(request: Request, document_ids: List[str] = Body(...)
                 raise HTTPException(status_code=404, detail="One or more IDs not found")
             vector_store.delete(ids=document_ids)
 
+        invalidate_file_caches(document_ids)
+
         file_count = len(document_ids)
-        return {
+        response = {
             "message": f"Documents for {file_count} file{'s' if file_count > 1 else ''} deleted successfully"
         }
+        if deleted is not None:
+            response["deleted"] = deleted
+        if tombstoned is not None:
+            response["tombstoned"] = tombstoned
+        return response
     except HTTPException as http_exc:
         logger.error(
             "HTTP Exception in delete_documents | Status: %d | Detail: %s",
@@ -390,114 +627,140 @@ async def delete_documents(request: Request, document_ids: List[str] = Body(...)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def get_custom_ids_by_file_id_pattern(file_id: str, executor=None) -> List[str]:
-    """Find all custom_ids that start with the given file_id pattern."""
-    from langchain_core.runnables.config import run_in_executor
-    from sqlalchemy import text
-    
-    def _get_custom_ids_sync(file_id: str) -> List[str]:
-        """Synchronous version that queries the database directly."""
-        try:
-            # Use SQLAlchemy's text() for parameterized queries
-            query = text("SELECT custom_id FROM langchain_pg_embedding WHERE custom_id LIKE :pattern")
-            pattern = f"{file_id}_%"
-            
-            # Try to create a session using vector store's method
-            if hasattr(vector_store, '_make_session'):
-                with vector_store._make_session() as session:
-                    result = session.execute(query, {"pattern": pattern})
-                    custom_ids = [row[0] for row in result.fetchall()]
-                    logger.info(f"Found {len(custom_ids)} custom_ids for file_id {file_id}")
-                    return custom_ids
-            
-            # Alternative: try to use the _bind attribute
-            elif hasattr(vector_store, '_bind') and vector_store._bind:
-                with vector_store._bind.connect() as connection:
-                    result = connection.execute(query, {"pattern": pattern})
-                    custom_ids = [row[0] for row in result.fetchall()]
-                    logger.info(f"Found {len(custom_ids)} custom_ids for file_id {file_id}")
-                    return custom_ids
-            
-            # Try to create an engine and connect
-            elif hasattr(vector_store, '_create_engine'):
-                engine = vector_store._create_engine()
-                with engine.connect() as connection:
-                    result = connection.execute(query, {"pattern": pattern})
-                    custom_ids = [row[0] for row in result.fetchall()]
-                    logger.info(f"Found {len(custom_ids)} custom_ids for file_id {file_id}")
-                    return custom_ids
-            
-            logger.warning(f"Could not access database connection for pattern search. Using fallback for file_id: {file_id}")
-            # Fallback: return empty list to trigger 404
-            return []
-                    
-        except Exception as e:
-            logger.error(f"Error getting custom_ids for file_id {file_id}: {str(e)}")
-            logger.debug(f"Vector store type: {type(vector_store)}, attributes: {dir(vector_store)}")
-            # Fallback: return empty list to trigger 404 
-            return []
-    
-    if executor:
-        return await run_in_executor(executor, _get_custom_ids_sync, file_id)
-    else:
-        return _get_custom_ids_sync(file_id)
-
-class QueryEmbeddingCache:
-    """Enhanced cache for query embeddings with normalization"""
-
-    def __init__(self, max_size: int = 1000):
-        self.cache = {}
-        self.max_size = max_size
-        self.access_order = []
-
-    def _normalize_query(self, query: str) -> str:
-        """Normalize query for better cache hits"""
-        # Remove extra whitespace
-        normalized = ' '.join(query.split())
-        # Convert to lowercase
-        normalized = normalized.lower()
-        # Fix common encoding issues
-        normalized = normalized.encode('utf-8', errors='ignore').decode('utf-8')
-        return normalized
-
-    def _get_cache_key(self, query: str) -> str:
-        """Generate cache key from normalized query"""
-        normalized = self._normalize_query(query)
-        return hashlib.md5(normalized.encode('utf-8')).hexdigest()
-
-    def get(self, query: str):
-        """Get embedding from cache"""
-        key = self._get_cache_key(query)
-        if key in self.cache:
-            # Move to end (most recently used)
-            self.access_order.remove(key)
-            self.access_order.append(key)
-            return self.cache[key]
-        return None
+embedding_cache = QueryEmbeddingCache(
+    max_size=QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+    max_bytes=QUERY_EMBEDDING_CACHE_MAX_BYTES,
+    ttl=QUERY_EMBEDDING_CACHE_TTL,
+)
+
+# Cleaned search results keyed by request parameters, invalidated per file_id
+query_result_cache = None
+if QUERY_RESULT_CACHE_MAX_ENTRIES > 0:
+    query_result_cache = FileScopedCache(
+        max_size=QUERY_RESULT_CACHE_MAX_ENTRIES,
+        ttl=QUERY_RESULT_CACHE_TTL,
+    )
+
+# zlib-compressed /documents/{id}/context text keyed by file_id
+document_context_cache = None
+if DOCUMENT_CONTEXT_CACHE_MAX_ENTRIES > 0:
+    document_context_cache = FileScopedCache(
+        max_size=DOCUMENT_CONTEXT_CACHE_MAX_ENTRIES,
+        ttl=DOCUMENT_CONTEXT_CACHE_TTL,
+    )
+
+ingest_jobs = IngestJobQueue(
+    hybrid_search_service.get_pool,
+    workers=INGEST_JOB_WORKERS,
+    max_depth=INGEST_JOB_MAX_DEPTH,
+)
 
-    def set(self, query: str, embedding):
-        """Store embedding in cache"""
-        key = self._get_cache_key(query)
+# Identifies the vector space; stored on chunks so vectors are only reused within it
+EMBEDDING_MODEL_ID = f"{EMBEDDINGS_PROVIDER.value}:{EMBEDDINGS_MODEL}"
+
+# Optional second tier shared by all workers and preserved across restarts
+persistent_embedding_store = None
+if QUERY_EMBEDDING_CACHE_PERSIST == "postgres":
+    persistent_embedding_store = PostgresEmbeddingStore(
+        hybrid_search_service.get_pool,
+        model=EMBEDDING_MODEL_ID,
+        ttl=QUERY_EMBEDDING_CACHE_TTL,
+    )
+
+# Providers whose embed_query(q) equals embed_documents([q])[0], so batching is safe
+BATCHABLE_QUERY_PROVIDERS = {
+    EmbeddingsProvider.OPENAI,
+    EmbeddingsProvider.AZURE,
+    EmbeddingsProvider.HUGGINGFACE,
+    EmbeddingsProvider.HUGGINGFACETEI,
+    EmbeddingsProvider.OLLAMA,
+}
+
+
+async def embed_texts(texts: List[str], executor=None) -> List[List[float]]:
+    """Embed texts with the provider's native async API, or on `executor`"""
+    embedding_function = vector_store.embedding_function
+    if type(embedding_function).aembed_documents is not Embeddings.aembed_documents:
+        return await embedding_function.aembed_documents(texts)
+    return await run_in_executor(executor, embedding_function.embed_documents, texts)
+
+
+async def _embed_query_batch(texts: List[str]) -> List[List[float]]:
+    """Embed several queries with one provider call"""
+    return await embed_texts(texts, _get_query_embedding_executor())
+
+
+# Default ingest embedding concurrency: hosted APIs take parallel requests,
+# local models (sentence-transformers, Ollama) would only contend for the same hardware
+INGEST_EMBED_PROVIDER_CONCURRENCY = {
+    EmbeddingsProvider.OPENAI: 8,
+    EmbeddingsProvider.AZURE: 4,
+    EmbeddingsProvider.HUGGINGFACE: 1,
+    EmbeddingsProvider.HUGGINGFACETEI: 4,
+    EmbeddingsProvider.OLLAMA: 1,
+    EmbeddingsProvider.BEDROCK: 4,
+    EmbeddingsProvider.GOOGLE_GENAI: 4,
+    EmbeddingsProvider.GOOGLE_VERTEXAI: 4,
+}
+
+ingest_embedder = AdaptiveEmbedder(
+    embed_texts,
+    max_concurrency=INGEST_EMBED_CONCURRENCY
+    or INGEST_EMBED_PROVIDER_CONCURRENCY.get(EMBEDDINGS_PROVIDER, 2),
+    max_retries=INGEST_EMBED_MAX_RETRIES,
+)
+
+query_embedding_batcher = None
+if QUERY_EMBEDDING_BATCH_WINDOW_MS > 0 and EMBEDDINGS_PROVIDER in BATCHABLE_QUERY_PROVIDERS:
+    query_embedding_batcher = QueryEmbeddingBatcher(
+        _embed_query_batch,
+        window=QUERY_EMBEDDING_BATCH_WINDOW_MS / 1000,
+        max_batch_size=QUERY_EMBEDDING_BATCH_MAX_SIZE,
+    )
+
+# Provider calls in flight, keyed by normalized query (single-flight)
+_inflight_embeddings: dict = {}
+_query_embedding_executor = None
 
-        # Remove oldest if cache is full
-        if len(self.cache) >= self.max_size and key not in self.cache:
-            oldest = self.access_order.pop(0)
-            del self.cache[oldest]
 
-        self.cache[key] = embedding
-        if key in self.access_order:
-            self.access_order.remove(key)
-        self.access_order.append(key)
+def _get_query_embedding_executor() -> ThreadPoolExecutor:
+    """Dedicated threads for providers without a native aembed_query"""
+    global _query_embedding_executor
+    if _query_embedding_executor is None:
+        _query_embedding_executor = ThreadPoolExecutor(
+            max_workers=QUERY_EMBEDDING_THREADS, thread_name_prefix="query-embed"
+        )
+    return _query_embedding_executor
+
+
+async def _embed_query(query: str):
+    """Compute a query embedding without blocking the event loop"""
+    key = embedding_cache._get_cache_key(query)
+    if persistent_embedding_store is not None:
+        embedding = await persistent_embedding_store.get(key)
+        if embedding is not None:
+            embedding_cache.set(query, embedding)
+            return embedding
+
+    embedding_function = vector_store.embedding_function
+    if query_embedding_batcher is not None:
+        embedding = await query_embedding_batcher.embed(query)
+    elif type(embedding_function).aembed_query is not Embeddings.aembed_query:
+        embedding = await embedding_function.aembed_query(query)
+    else:
+        # The base implementation would borrow the loop's default executor
+        embedding = await run_in_executor(
+            _get_query_embedding_executor(), embedding_function.embed_query, query
+        )
 
-    def clear(self):
-        """Clear the cache"""
-        self.cache.clear()
-        self.access_order.clear()
+    # Store in cache
+    embedding_cache.set(query, embedding)
+    if persistent_embedding_store is not None:
+        persistent_embedding_store.set(key, embedding)
+    return embedding
 
-embedding_cache = QueryEmbeddingCache(max_size=1000)
 
-# Cache the embedding function with LRU cache
-def get_cached_query_embedding(query: str):
+async def get_cached_query_embedding(query: str):
     """Get query embedding with caching"""
     # Check cache first
     cached = embedding_cache.get(query)
@@ -505,14 +768,214 @@ def get_cached_query_embedding(query: str):
         logger.debug(f"Cache hit for query: {query[:50]}...")
         return cached
 
-    # Compute embedding
-    logger.debug(f"Cache miss for query: {query[:50]}...")
-    embedding = vector_store.embedding_function.embed_query(query)
+    # Concurrent misses for the same normalized query share one provider call
+    key = embedding_cache._get_cache_key(query)
+    task = _inflight_embeddings.get(key)
+    if task is None:
+        logger.debug(f"Cache miss for query: {query[:50]}...")
+        task = asyncio.ensure_future(_embed_query(query))
+        _inflight_embeddings[key] = task
+        task.add_done_callback(lambda _: _inflight_embeddings.pop(key, None))
 
-    # Store in cache
-    embedding_cache.set(query, embedding)
+    # Shield so a cancelled/timed-out caller does not cancel the shared call
+    return await asyncio.shield(task)
+
+
+async def run_hybrid_search(
+    request: Request,
+    query: str,
+    embedding: List[float],
+    k: int,
+    filter_dict: dict,
+    semantic_weight: float,
+) -> List[tuple]:
+    """
+    Run semantic + BM25 search and fuse them with RRF.
+    With HYBRID_SQL_FUSION the whole pipeline runs as one statement in Postgres.
+    """
+    k_expanded = int(k * HYBRID_EXPANSION_FACTOR)
+
+    if HYBRID_SQL_FUSION and isinstance(vector_store, AsyncPgVector):
+        if hybrid_search_service.supports_filter(filter_dict):
+            return await hybrid_search_service.hybrid_search(
+                query,
+                embedding,
+                k=k,
+                filter_dict=filter_dict,
+                semantic_weight=semantic_weight,
+                fusion_k=HYBRID_FUSION_K,
+                candidates=k_expanded,
+                collection_name=vector_store.collection_name,
+                distance_operator=vector_store.get_distance_operator()
+            )
+
+    # Semantic search
+    if isinstance(vector_store, AsyncPgVector):
+        semantic_task = vector_store.asimilarity_search_with_score_by_vector(
+            embedding,
+            k=k_expanded,
+            filter=filter_dict,
+            executor=request.app.state.thread_pool,
+        )
+    else:
+        semantic_task = asyncio.create_task(
+            asyncio.to_thread(
+                vector_store.similarity_search_with_score_by_vector,
+                embedding,
+                k=k_expanded,
+                filter=filter_dict
+            )
+        )
+
+    # BM25 search
+    bm25_task = hybrid_search_service.bm25_search(
+        query,
+        k=k_expanded,
+        filter_dict=filter_dict,
+        diagnostics=diagnostics_requested(request)
+    )
+
+    semantic_results, bm25_results = await asyncio.gather(semantic_task, bm25_task)
+
+    # Combine using RRF
+    return hybrid_search_service.reciprocal_rank_fusion(
+        semantic_results,
+        bm25_results,
+        k=HYBRID_FUSION_K,
+        semantic_weight=semantic_weight
+    )[:k]
+
+
+async def search_documents(
+    request: Request,
+    query: str,
+    filter_dict: dict,
+    k: int,
+    search_type: SearchType,
+    semantic_weight: float,
+) -> List[tuple]:
+    """Run the requested search type and return (Document, score) pairs with cleaned metadata"""
+    if search_type == SearchType.bm25:
+        # Pure BM25 search
+        try:
+            documents = await asyncio.wait_for(
+                hybrid_search_service.bm25_search(
+                    query,
+                    k=k,
+                    filter_dict=filter_dict,
+                    diagnostics=diagnostics_requested(request)
+                ),
+                timeout=HYBRID_SEARCH_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"BM25 search timed out after {HYBRID_SEARCH_TIMEOUT}s")
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Search operation timed out"
+            )
+
+    elif search_type == SearchType.hybrid:
+        # Hybrid search - run both in parallel
+        embedding = await get_cached_query_embedding(query)  # Use improved cache
+
+        try:
+            documents = await asyncio.wait_for(
+                run_hybrid_search(
+                    request,
+                    query,
+                    embedding,
+                    k=k,
+                    filter_dict=filter_dict,
+                    semantic_weight=semantic_weight
+                ),
+                timeout=HYBRID_SEARCH_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Hybrid search timed out after {HYBRID_SEARCH_TIMEOUT}s")
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Search operation timed out"
+            )
+
+    else:
+        # Default semantic search
+        embedding = await get_cached_query_embedding(query)  # Use improved cache
+        if isinstance(vector_store, AsyncPgVector):
+            documents = await vector_store.asimilarity_search_with_score_by_vector(
+                embedding,
+                k=k,
+                filter=filter_dict,
+                executor=request.app.state.thread_pool,
+            )
+        else:
+            documents = vector_store.similarity_search_with_score_by_vector(
+                embedding, k=k, filter=filter_dict
+            )
+
+    # Clean metadata before returning
+    return [clean_metadata_for_response(doc, score) for doc, score in documents]
 
-    return embedding
+
+async def cached_search_documents(
+    request: Request,
+    query: str,
+    file_ids: List[str],
+    filter_dict: dict,
+    k: int,
+    search_type: SearchType,
+    semantic_weight: float,
+) -> List[tuple]:
+    """search_documents behind the file-scoped result cache"""
+    if query_result_cache is None:
+        return await search_documents(
+            request, query, filter_dict, k, search_type, semantic_weight
+        )
+
+    cache_key = (
+        embedding_cache._normalize_query(query),
+        tuple(sorted(file_ids)),
+        k,
+        search_type.value,
+        semantic_weight if search_type == SearchType.hybrid else None,
+    )
+    documents = query_result_cache.get(cache_key)
+    if documents is not None:
+        return documents
+
+    snapshot = query_result_cache.snapshot()
+    documents = await search_documents(
+        request, query, filter_dict, k, search_type, semantic_weight
+    )
+    query_result_cache.set(cache_key, documents, file_ids, snapshot)
+    return documents
+
+
+def _invalidate_local_file_caches(file_ids: List[str]) -> None:
+    if query_result_cache is not None:
+        query_result_cache.invalidate_files(file_ids)
+    if document_context_cache is not None:
+        document_context_cache.invalidate_files(file_ids)
+
+
+def _clear_local_file_caches() -> None:
+    if query_result_cache is not None:
+        query_result_cache.clear()
+    if document_context_cache is not None:
+        document_context_cache.clear()
+
+
+# Carries invalidations to the other API workers (started on startup)
+cache_invalidation = CacheInvalidationBus(
+    hybrid_search_service._get_dsn,
+    hybrid_search_service.get_pool,
+    on_invalidate=_invalidate_local_file_caches,
+    on_reset=_clear_local_file_caches,
+)
+
+
+def invalidate_file_caches(file_ids: List[str]) -> None:
+    """Drop cached results for files whose chunks changed, in every worker"""
+    cache_invalidation.publish(file_ids)
 
 
 @router.post("/query")
@@ -540,93 +1003,15 @@ async def query_embeddings_by_file_id(
                 )
                 body.search_type = SearchType.semantic
 
-        if use_hybrid and body.search_type == SearchType.bm25:
-            # Pure BM25 search
-            try:
-                documents = await asyncio.wait_for(
-                    hybrid_search_service.bm25_search(
-                        body.query,
-                        k=body.k,
-                        filter_dict={"file_id": body.file_id}
-                    ),
-                    timeout=HYBRID_SEARCH_TIMEOUT
-                )
-            except asyncio.TimeoutError:
-                logger.error(f"BM25 search timed out after {HYBRID_SEARCH_TIMEOUT}s")
-                raise HTTPException(
-                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
-                    detail="Search operation timed out"
-                )
-
-        elif use_hybrid and body.search_type == SearchType.hybrid:
-            # Hybrid search - run both in parallel
-            embedding = get_cached_query_embedding(body.query)  # Use improved cache
-            k_expanded = int(body.k * HYBRID_EXPANSION_FACTOR)
-
-            # Semantic search
-            if isinstance(vector_store, AsyncPgVector):
-                semantic_task = vector_store.asimilarity_search_with_score_by_vector(
-                    embedding,
-                    k=k_expanded,
-                    filter={"file_id": body.file_id},
-                    executor=request.app.state.thread_pool,
-                )
-            else:
-                semantic_task = asyncio.create_task(
-                    asyncio.to_thread(
-                        vector_store.similarity_search_with_score_by_vector,
-                        embedding,
-                        k=k_expanded,
-                        filter={"file_id": body.file_id}
-                    )
-                )
-
-            # BM25 search
-            bm25_task = hybrid_search_service.bm25_search(
-                body.query,
-                k=k_expanded,
-                filter_dict={"file_id": body.file_id}
-            )
-
-            try:
-                # Wait for both with timeout
-                semantic_results, bm25_results = await asyncio.wait_for(
-                    asyncio.gather(semantic_task, bm25_task),
-                    timeout=HYBRID_SEARCH_TIMEOUT
-                )
-
-                # Combine using RRF
-                documents = hybrid_search_service.reciprocal_rank_fusion(
-                    semantic_results,
-                    bm25_results,
-                    k=HYBRID_FUSION_K,
-                    semantic_weight=body.semantic_weight
-                )[:body.k]
-
-            except asyncio.TimeoutError:
-                logger.error(f"Hybrid search timed out after {HYBRID_SEARCH_TIMEOUT}s")
-                raise HTTPException(
-                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
-                    detail="Search operation timed out"
-                )
-
-        else:
-            # Default semantic search
-            embedding = get_cached_query_embedding(body.query)  # Use improved cache
-            if isinstance(vector_store, AsyncPgVector):
-                documents = await vector_store.asimilarity_search_with_score_by_vector(
-                    embedding,
-                    k=body.k,
-                    filter={"file_id": body.file_id},
-                    executor=request.app.state.thread_pool,
-                )
-            else:
-                documents = vector_store.similarity_search_with_score_by_vector(
-                    embedding, k=body.k, filter={"file_id": body.file_id}
-                )
-
-        # Clean metadata before returning
-        documents = [clean_metadata_for_response(doc, score) for doc, score in documents]
+        documents = await cached_search_documents(
+            request,
+            body.query,
+            file_ids=[body.file_id],
+            filter_dict={"file_id": body.file_id},
+            k=body.k,
+            search_type=body.search_type,
+            semantic_weight=body.semantic_weight
+        )
 
         if not documents:
             return authorized_documents
@@ -683,20 +1068,239 @@ def generate_digest(page_content: str):
     return hash_obj.hexdigest()
 
 
+async def _find_reusable_embeddings(digests: List[str]) -> dict:
+    return await hybrid_search_service.find_embeddings_by_digest(digests, EMBEDDING_MODEL_ID)
+
+
+embedding_reuse = None
+if INGEST_REUSE_EMBEDDINGS:
+    embedding_reuse = DigestReuseEmbedder(
+        _find_reusable_embeddings,
+        ingest_embedder.embed,
+        generate_digest,
+    )
+
+
+def iter_chunks(
+    documents: List[Document],
+    file_id: str,
+    user_id: str,
+    clean_content: bool = False,
+    positions_as_text: bool = False,
+    file_sha256: str = None,
+):
+    """
+    Yield (text, metadata, chunk_id) for each split document, built lazily
+    so only the batches in flight exist as full chunk records.
+    """
+    total_chunks = len(documents)
+    for i, doc in enumerate(documents):
+        content = clean_text(doc.page_content) if clean_content else doc.page_content
+        metadata = {
+            "file_id": file_id,
+            "user_id": user_id,
+            "digest": generate_digest(content),
+            "embedding_model": EMBEDDING_MODEL_ID,
+            "chunk_index": str(i) if positions_as_text else i,
+            "total_chunks": str(total_chunks) if positions_as_text else total_chunks,
+            **(doc.metadata or {}),
+        }
+        if file_sha256:
+            metadata["file_sha256"] = file_sha256
+        yield content, metadata, generate_chunk_id(file_id, content, i)
+
+
+async def _run_ingest_pipeline(writer, chunks, executor=None):
+    """Embed `chunks` and insert them through `writer`; returns (ids, pipeline)"""
+    embedder = embedding_reuse or ingest_embedder
+    ids = []
+
+    async def write_batch(texts, embeddings, metadatas, custom_ids):
+        ids.extend(custom_ids)
+        return await writer.write(texts, embeddings, metadatas, custom_ids)
+
+    pipeline = IngestPipeline(
+        lambda texts: embedder.embed(texts, executor),
+        write_batch,
+        batch_size=INGEST_BATCH_SIZE,
+        queue_depth=INGEST_QUEUE_DEPTH,
+        embed_concurrency=ingest_embedder.max_concurrency,
+    )
+    await pipeline.run(chunks)
+    return ids, pipeline
+
+
+async def stream_chunks_to_vector_db(
+    documents: List[Document],
+    file_id: str,
+    user_id: str = "",
+    clean_content: bool = False,
+    executor=None,
+    file_sha256: str = None,
+):
+    """
+    Embed and insert chunks through IngestPipeline: embedding of the next
+    batch overlaps the insert of the current one, inside one transaction.
+    """
+    try:
+        # Hybrid search stores chunk positions as text, like the search_text update did
+        with_search_text = await ensure_hybrid_search_initialized()
+        hybrid_search_service.ensure_ingest_indexes()
+
+        async with hybrid_search_service.chunk_writer(
+            vector_store.collection_name, with_search_text=with_search_text
+        ) as writer:
+            ids, pipeline = await _run_ingest_pipeline(
+                writer,
+                iter_chunks(
+                    documents, file_id, user_id, clean_content, with_search_text, file_sha256
+                ),
+                executor,
+            )
+
+        invalidate_file_caches([file_id])
+        logger.info(
+            f"Document {file_id} stored with {len(ids)} chunks | {pipeline.stats()}"
+        )
+        return {"message": "Documents added successfully", "ids": ids}
+
+    except Exception as e:
+        logger.error(
+            f"Failed to store data in vector DB | File ID: {file_id} | "
+            f"User ID: {user_id} | Error: {e} | Traceback: {traceback.format_exc()}"
+        )
+        return {"message": "An error occurred while adding documents.", "error": str(e)}
+
+
+def _chunk_position(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def reindex_file_incrementally(
+    documents: List[Document],
+    file_id: str,
+    user_id: str = "",
+    clean_content: bool = False,
+    executor=None,
+    file_sha256: str = None,
+):
+    """
+    Update an already stored file by chunk digest: embed and insert only new
+    chunks, delete chunks that disappeared and rewrite the position metadata
+    of unchanged chunks that moved. All changes commit together.
+    """
+    try:
+        with_search_text = await ensure_hybrid_search_initialized()
+        hybrid_search_service.ensure_ingest_indexes()
+
+        existing = await hybrid_search_service.get_file_chunks(
+            file_id, vector_store.collection_name
+        )
+        total_chunks = len(documents)
+
+        # Stored rows per digest, in chunk order, so repeated chunks pair up in order
+        stored = {}
+        for row in sorted(existing, key=lambda r: _chunk_position(r["chunk_index"]) or 0):
+            stored.setdefault(row["digest"], deque()).append(row)
+
+        added = set()
+        moved_ids, moved_indexes = [], []
+        for i, doc in enumerate(documents):
+            content = clean_text(doc.page_content) if clean_content else doc.page_content
+            rows = stored.get(generate_digest(content))
+            if not rows:
+                added.add(i)
+                continue
+            row = rows.popleft()
+            if (
+                _chunk_position(row["chunk_index"]) != i
+                or _chunk_position(row["total_chunks"]) != total_chunks
+            ):
+                moved_ids.append(row["uuid"])
+                moved_indexes.append(i)
+
+        removed_ids = [row["uuid"] for rows in stored.values() for row in rows]
+        added_chunks = (
+            chunk
+            for i, chunk in enumerate(
+                iter_chunks(
+                    documents, file_id, user_id, clean_content, with_search_text, file_sha256
+                )
+            )
+            if i in added
+        )
+
+        async with hybrid_search_service.chunk_writer(
+            vector_store.collection_name, with_search_text=with_search_text
+        ) as writer:
+            removed = await writer.delete(removed_ids)
+            moved = await writer.update_positions(
+                moved_ids, moved_indexes, total_chunks, as_text=with_search_text
+            )
+            ids, pipeline = await _run_ingest_pipeline(writer, added_chunks, executor)
+            # Kept chunks now belong to the new upload's bytes
+            await writer.stamp_file(file_id, file_sha256)
+
+        invalidate_file_caches([file_id])
+        summary = {
+            "added": len(ids),
+            "removed": removed,
+            "moved": moved,
+            "unchanged": total_chunks - len(ids) - moved,
+        }
+        logger.info(f"Document {file_id} re-indexed incrementally | {summary} | {pipeline.stats()}")
+        return {"message": "Documents updated successfully", "ids": ids, **summary}
+
+    except Exception as e:
+        logger.error(
+            f"Failed to re-index file in vector DB | File ID: {file_id} | "
+            f"User ID: {user_id} | Error: {e} | Traceback: {traceback.format_exc()}"
+        )
+        return {"message": "An error occurred while updating documents.", "error": str(e)}
+
+
 async def store_data_in_vector_db(
     data: Iterable[Document],
     file_id: str,
     user_id: str = "",
     clean_content: bool = False,
     executor=None,
+    incremental: bool = False,
+    presplit: bool = False,
+    file_sha256: str = None,
 ) -> bool:
     """
     Store document data in vector database
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
-    )
-    documents = text_splitter.split_documents(data)
+    if presplit:
+        # Already split (and cleaned) by load_for_ingest
+        documents = list(data)
+    else:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+        )
+        documents = text_splitter.split_documents(data)
+
+    if isinstance(vector_store, AsyncPgVector):
+        # Rows of a tombstoned file would hide the new ones: purge them first
+        await hybrid_search_service.purge_file(file_id, vector_store.collection_name)
+
+    if incremental:
+        if isinstance(vector_store, AsyncPgVector):
+            return await reindex_file_incrementally(
+                documents, file_id, user_id, clean_content, executor, file_sha256
+            )
+        logger.warning(
+            f"Incremental re-indexing needs the async pgvector store, storing {file_id} in full"
+        )
+
+    if SINGLE_PASS_INGEST and isinstance(vector_store, AsyncPgVector):
+        return await stream_chunks_to_vector_db(
+            documents, file_id, user_id, clean_content, executor, file_sha256
+        )
 
     if clean_content:
         for doc in documents:
@@ -716,9 +1320,11 @@ async def store_data_in_vector_db(
                     "file_id": file_id,
                     "user_id": user_id,
                     "digest": generate_digest(doc.page_content),
+                    "embedding_model": EMBEDDING_MODEL_ID,
                     "chunk_index": i,
                     "total_chunks": len(documents),
                     **(doc.metadata or {}),
+                    **({"file_sha256": file_sha256} if file_sha256 else {}),
                 },
             )
         )
@@ -735,23 +1341,25 @@ async def store_data_in_vector_db(
         # If hybrid search is enabled, update search_text
         if ENABLE_HYBRID_SEARCH:
             if await ensure_hybrid_search_initialized():
-                success = await hybrid_search_service.update_search_text_batch(
+                updated = await hybrid_search_service.update_search_text_batch(
                     docs,
                     file_id,
                     chunk_ids,
                     max_retries=HYBRID_MAX_RETRIES
                 )
 
-                if not success:
+                if not all(updated):
                     logger.warning(
-                        f"Failed to update search_text for BM25, "
-                        f"documents may not be fully searchable via hybrid search"
+                        f"Failed to update search_text for {updated.count(False)}/{len(updated)} "
+                        f"chunks, documents may not be fully searchable via hybrid search"
                     )
 
                 logger.info(
                     f"Document {file_id} stored with {len(documents)} chunks."
                 )
 
+        invalidate_file_caches([file_id])
+
         return {"message": "Documents added successfully", "ids": ids}
 
     except Exception as e:
@@ -762,6 +1370,80 @@ async def store_data_in_vector_db(
         return {"message": "An error occurred while adding documents.", "error": str(e)}
 
 
+async def run_ingest_job(
+    filename: str,
+    content_type: str,
+    file_path: str,
+    file_id: str,
+    user_id: str,
+    executor,
+    incremental: bool = False,
+    remove_file: bool = False,
+    source: str = None,
+    file_sha256: str = None,
+) -> dict:
+    """Load and store one file for an async ingest job; raises on failure"""
+    try:
+        data, known_type, file_ext, processed = await load_for_ingest(
+            filename, content_type, file_path, executor
+        )
+        if source:
+            _restore_source(data, file_path, source)
+        result = await store_data_in_vector_db(
+            data,
+            file_id,
+            user_id,
+            clean_content=file_ext == "pdf" and not processed,
+            executor=executor,
+            incremental=incremental,
+            presplit=processed,
+            file_sha256=file_sha256,
+        )
+        if not result or "error" in result:
+            raise RuntimeError(
+                str(result["error"]) if result else "Failed to process/store the file data."
+            )
+        return {
+            "file_id": file_id,
+            "filename": filename,
+            "known_type": known_type,
+            "chunks": len(result.get("ids", [])),
+        }
+    finally:
+        if remove_file:
+            await cleanup_temp_file_async(file_path)
+
+
+async def submit_ingest_job(run, file_id: str, filename: str, user_id: str) -> JSONResponse:
+    """Queue an ingest job and answer 202, or 503 when the backlog is full"""
+    try:
+        job_id = await ingest_jobs.submit(run, file_id, filename, user_id)
+    except IngestQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "30"},
+        )
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
+            "status": True,
+            "message": "File queued for processing.",
+            "job_id": job_id,
+            "file_id": file_id,
+            "filename": filename,
+        },
+    )
+
+
+@router.get("/embed/jobs/{job_id}")
+async def get_ingest_job(job_id: str):
+    job = await ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @router.post("/local/embed")
 async def embed_local_file(
     document: StoreDocument, request: Request, entity_id: str = None
@@ -778,21 +1460,45 @@ async def embed_local_file(
     else:
         user_id = entity_id if entity_id else request.state.user.get("id")
 
-    try:
-        loader, known_type, file_ext = get_loader(
-            document.filename, document.file_content_type, document.filepath
+    # Stamped on the chunks like /embed does, for SHA-256 dedup of later uploads
+    file_sha256 = await run_in_executor(
+        request.app.state.thread_pool, hash_file, document.filepath
+    )
+
+    if document.async_mode:
+        return await submit_ingest_job(
+            lambda: run_ingest_job(
+                document.filename,
+                document.file_content_type,
+                document.filepath,
+                document.file_id,
+                user_id,
+                request.app.state.thread_pool,
+                incremental=document.incremental,
+                file_sha256=file_sha256,
+            ),
+            document.file_id,
+            document.filename,
+            user_id,
         )
-        data = await run_in_executor(request.app.state.thread_pool, loader.load)
 
-        # Clean up temporary UTF-8 file if it was created for encoding conversion
-        cleanup_temp_encoding_file(loader)
+    try:
+        data, known_type, file_ext, processed = await load_for_ingest(
+            document.filename,
+            document.file_content_type,
+            document.filepath,
+            request.app.state.thread_pool,
+        )
 
         result = await store_data_in_vector_db(
             data,
             document.file_id,
             user_id,
-            clean_content=file_ext == "pdf",
+            clean_content=file_ext == "pdf" and not processed,
             executor=request.app.state.thread_pool,
+            incremental=document.incremental,
+            presplit=processed,
+            file_sha256=file_sha256,
         )
 
         if result:
@@ -834,6 +1540,8 @@ async def embed_file(
     file_id: str = Form(...),
     file: UploadFile = File(...),
     entity_id: str = Form(None),
+    incremental: bool = Form(False),
+    async_mode: bool = Form(False),
 ):
     response_status = True
     response_message = "File processed successfully."
@@ -842,15 +1550,54 @@ async def embed_file(
     user_id = get_user_id(request, entity_id)
     temp_base_path = os.path.join(RAG_UPLOAD_DIR, user_id)
     os.makedirs(temp_base_path, exist_ok=True)
-    temp_file_path = os.path.join(RAG_UPLOAD_DIR, user_id, file.filename)
 
-    await save_upload_file_async(file, temp_file_path)
+    # Where uploads used to be written; kept as the chunks' `source` metadata
+    source_path = os.path.join(RAG_UPLOAD_DIR, user_id, file.filename)
+    upload = await receive_upload_file(file, temp_base_path)
+
+    reused = await reuse_identical_upload(
+        upload.sha256, file_id, user_id, source_path, incremental
+    )
+    if reused:
+        await upload.close()
+        return {
+            "status": True,
+            "message": reused,
+            "file_id": file_id,
+            "filename": file.filename,
+            # Only files that were parsed successfully before can match
+            "known_type": True,
+        }
+
+    if async_mode:
+        try:
+            job_file_path = await upload.to_path()
+            return await submit_ingest_job(
+                lambda: run_ingest_job(
+                    file.filename,
+                    file.content_type,
+                    job_file_path,
+                    file_id,
+                    user_id,
+                    request.app.state.thread_pool,
+                    incremental=incremental,
+                    remove_file=True,
+                    source=source_path,
+                    file_sha256=upload.sha256,
+                ),
+                file_id,
+                file.filename,
+                user_id,
+            )
+        except Exception:
+            await upload.close()
+            raise
 
     try:
-        data, known_type, file_ext = await load_file_content(
-            file.filename,
+        data, known_type, file_ext, processed = await load_upload_for_ingest(
+            upload,
             file.content_type,
-            temp_file_path,
+            source_path,
             request.app.state.thread_pool,
         )
 
@@ -858,8 +1605,11 @@ async def embed_file(
             data=data,
             file_id=file_id,
             user_id=user_id,
-            clean_content=file_ext == "pdf",
+            clean_content=file_ext == "pdf" and not processed,
             executor=request.app.state.thread_pool,
+            incremental=incremental,
+            presplit=processed,
+            file_sha256=upload.sha256,
         )
 
         if not result:
@@ -901,7 +1651,7 @@ async def embed_file(
             detail=f"Error during file processing: {str(e)}",
         )
     finally:
-        await cleanup_temp_file_async(temp_file_path)
+        await upload.close()
 
     return {
         "status": response_status,
@@ -912,34 +1662,318 @@ async def embed_file(
     }
 
 
+async def _prepare_batch_file(
+    item: dict,
+    filename: str,
+    content_type: str,
+    file_path: str,
+    slots: asyncio.Semaphore,
+    workers: asyncio.Semaphore,
+    executor,
+    split: bool = True,
+    upload: UploadFile = None,
+    user_id: str = "",
+) -> dict:
+    """
+    Load and split one file of a batch. An upload is received (and hashed)
+    first; `file_path` is then its `source` path, and a byte-identical file
+    that is already indexed is reused instead of being embedded again.
+    """
+    await slots.acquire()
+    item["slot"] = slots
+    received = None
+    try:
+        async with workers:
+            if upload is not None:
+                received = await receive_upload_file(upload, os.path.dirname(file_path))
+                item["file_sha256"] = received.sha256
+                reused = await reuse_identical_upload(
+                    received.sha256, item["file_id"], user_id, file_path
+                )
+                if reused:
+                    item["message"] = reused
+                    return item
+                data, item["known_type"], file_ext, processed = await load_upload_for_ingest(
+                    received, content_type, file_path, executor
+                )
+            else:
+                data, item["known_type"], file_ext, processed = await load_for_ingest(
+                    filename, content_type, file_path, executor
+                )
+            item["clean_content"] = file_ext == "pdf" and not processed
+            item["presplit"] = processed
+            if processed and split:
+                item["documents"] = data
+            elif split:
+                text_splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+                )
+                item["documents"] = await run_in_executor(
+                    executor, text_splitter.split_documents, data
+                )
+            else:
+                item["data"] = data
+    except Exception as e:
+        logger.error(f"Failed to load batch file {filename} | File ID: {item['file_id']} | Error: {e}")
+        item["error"] = e.detail if isinstance(e, HTTPException) else str(e)
+    finally:
+        if received is not None:
+            await received.close()
+    return item
+
+
+def _batch_file_result(item: dict, error: str = None) -> dict:
+    slot = item.pop("slot", None)
+    if slot is not None:
+        slot.release()
+    error = error or item.get("error")
+    result = {
+        "file_id": item["file_id"],
+        "filename": item["filename"],
+        "status": error is None,
+        "known_type": item.get("known_type"),
+    }
+    if error is not None:
+        result["error"] = error
+    elif "message" in item:
+        result["message"] = item["message"]
+    else:
+        result["chunks"] = item.get("chunks", 0)
+    return result
+
+
+async def _write_batch_group(group: List[dict], user_id: str, executor) -> List[dict]:
+    """
+    Embed and insert several files in one transaction. Each file runs in its
+    own savepoint, so a failing file is rolled back without affecting the rest.
+    """
+    errors = {}
+    try:
+        with_search_text = await ensure_hybrid_search_initialized()
+        hybrid_search_service.ensure_ingest_indexes()
+        for item in group:
+            # Rows of a tombstoned file would hide the new ones: purge them first
+            await hybrid_search_service.purge_file(item["file_id"], vector_store.collection_name)
+
+        async with hybrid_search_service.chunk_writer(
+            vector_store.collection_name, with_search_text=with_search_text
+        ) as writer:
+            for item in group:
+                try:
+                    async with writer.savepoint():
+                        ids, _ = await _run_ingest_pipeline(
+                            writer,
+                            iter_chunks(
+                                item.pop("documents"),
+                                item["file_id"],
+                                user_id,
+                                item["clean_content"],
+                                with_search_text,
+                                item.get("file_sha256"),
+                            ),
+                            executor,
+                        )
+                    item["chunks"] = len(ids)
+                except Exception as e:
+                    logger.error(f"Failed to store batch file | File ID: {item['file_id']} | Error: {e}")
+                    errors[item["file_id"]] = str(e)
+    except Exception as e:
+        # The group transaction itself failed: none of its files were stored
+        logger.error(
+            f"Failed to commit batch group | Files: {[item['file_id'] for item in group]} | "
+            f"Error: {e} | Traceback: {traceback.format_exc()}"
+        )
+        errors = {item["file_id"]: str(e) for item in group}
+
+    invalidate_file_caches([item["file_id"] for item in group if item["file_id"] not in errors])
+    return [_batch_file_result(item, errors.get(item["file_id"])) for item in group]
+
+
+async def store_file_batch(tasks: List[asyncio.Task], user_id: str, executor) -> List[dict]:
+    """
+    Store the files prepared by `tasks` as they become ready. With
+    SINGLE_PASS_INGEST and the async pgvector store, files are grouped into
+    transactions of roughly INGEST_BATCH_TRANSACTION_CHUNKS chunks; otherwise
+    each file is stored alone.
+    """
+    results = []
+    group, group_chunks = [], 0
+
+    for future in asyncio.as_completed(tasks):
+        item = await future
+        if "error" in item or "message" in item:
+            results.append(_batch_file_result(item))
+            continue
+
+        if "data" in item:
+            outcome = await store_data_in_vector_db(
+                item.pop("data"),
+                item["file_id"],
+                user_id,
+                clean_content=item["clean_content"],
+                executor=executor,
+                presplit=item["presplit"],
+                file_sha256=item.get("file_sha256"),
+            )
+            error = outcome.get("error") if isinstance(outcome, dict) else None
+            item["chunks"] = len(outcome.get("ids", [])) if isinstance(outcome, dict) else 0
+            results.append(_batch_file_result(item, str(error) if error else None))
+            continue
+
+        group.append(item)
+        group_chunks += len(item["documents"])
+        # Flush before every load slot is held by a file waiting in this group
+        if group_chunks >= INGEST_BATCH_TRANSACTION_CHUNKS or len(group) >= INGEST_BATCH_FILE_CONCURRENCY:
+            results.extend(await _write_batch_group(group, user_id, executor))
+            group, group_chunks = [], 0
+
+    if group:
+        results.extend(await _write_batch_group(group, user_id, executor))
+
+    return results
+
+
+def _check_batch_size(count: int):
+    if count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one file is required.",
+        )
+    if count > INGEST_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files in one batch (max {INGEST_BATCH_MAX_FILES}).",
+        )
+
+
+def _batch_semaphores():
+    # `workers` bounds concurrent loads; `slots` also counts loaded files
+    # waiting to be written, which bounds the memory held by the batch
+    workers = asyncio.Semaphore(max(1, INGEST_BATCH_FILE_CONCURRENCY))
+    slots = asyncio.Semaphore(max(1, INGEST_BATCH_FILE_CONCURRENCY) * 2)
+    return workers, slots
+
+
+@router.post("/embed/batch")
+async def embed_file_batch(
+    request: Request,
+    file_ids: List[str] = Form(...),
+    files: List[UploadFile] = File(...),
+    entity_id: str = Form(None),
+):
+    _check_batch_size(len(files))
+    if len(file_ids) != len(files):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="file_ids and files must have the same length.",
+        )
+
+    user_id = get_user_id(request, entity_id)
+    temp_base_path = os.path.join(RAG_UPLOAD_DIR, user_id)
+    os.makedirs(temp_base_path, exist_ok=True)
+
+    executor = request.app.state.thread_pool
+    split = SINGLE_PASS_INGEST and isinstance(vector_store, AsyncPgVector)
+    workers, slots = _batch_semaphores()
+
+    tasks = [
+        asyncio.ensure_future(_prepare_batch_file(
+            {"file_id": file_id, "filename": file.filename},
+            file.filename,
+            file.content_type,
+            # Chunks' `source`, as for /embed; spool files get unique names
+            os.path.join(temp_base_path, file.filename),
+            slots,
+            workers,
+            executor,
+            split=split,
+            upload=file,
+            user_id=user_id,
+        ))
+        for file_id, file in zip(file_ids, files)
+    ]
+    results = await store_file_batch(tasks, user_id, executor)
+
+    return {"status": all(r["status"] for r in results), "files": results}
+
+
+@router.post("/local/embed/batch")
+async def embed_local_file_batch(
+    batch: StoreDocumentBatch, request: Request, entity_id: str = None
+):
+    _check_batch_size(len(batch.documents))
+    user_id = get_user_id(request, entity_id)
+
+    executor = request.app.state.thread_pool
+    split = SINGLE_PASS_INGEST and isinstance(vector_store, AsyncPgVector)
+    workers, slots = _batch_semaphores()
+
+    tasks = []
+    for document in batch.documents:
+        item = {"file_id": document.file_id, "filename": document.filename}
+        if not os.path.exists(document.filepath):
+            item["error"] = ERROR_MESSAGES.FILE_NOT_FOUND
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(item)
+            tasks.append(future)
+            continue
+        tasks.append(asyncio.ensure_future(_prepare_batch_file(
+            item,
+            document.filename,
+            document.file_content_type,
+            document.filepath,
+            slots,
+            workers,
+            executor,
+            split=split,
+        )))
+    results = await store_file_batch(tasks, user_id, executor)
+
+    return {"status": all(r["status"] for r in results), "files": results}
+
+
 @router.get("/documents/{id}/context")
 async def load_document_context(request: Request, id: str):
+    if document_context_cache is not None:
+        cached = document_context_cache.get(id)
+        if cached is not None:
+            return zlib.decompress(cached).decode("utf-8")
+        snapshot = document_context_cache.snapshot()
+
     ids = [id]
     try:
         if isinstance(vector_store, AsyncPgVector):
-            existing_ids = await vector_store.get_filtered_ids(
-                ids, executor=request.app.state.thread_pool
-            )
-            documents = await vector_store.get_documents_by_ids(
-                ids, executor=request.app.state.thread_pool
+            # id is a file_id: select its chunks by metadata, in chunk order
+            hybrid_search_service.ensure_ingest_indexes()
+            documents = await hybrid_search_service.get_file_documents(
+                id, vector_store.collection_name
             )
+            if not documents:
+                raise HTTPException(
+                    status_code=404, detail="The specified file_id was not found"
+                )
         else:
             existing_ids = vector_store.get_filtered_ids(ids)
             documents = vector_store.get_documents_by_ids(ids)
 
-        # Ensure the requested id exists
-        if not all(id in existing_ids for id in ids):
-            raise HTTPException(
-                status_code=404, detail="The specified file_id was not found"
-            )
+            # Ensure the requested id exists
+            if not all(id in existing_ids for id in ids):
+                raise HTTPException(
+                    status_code=404, detail="The specified file_id was not found"
+                )
 
-        # Ensure documents list is not empty
-        if not documents:
-            raise HTTPException(
-                status_code=404, detail="No document found for the given ID"
-            )
+            # Ensure documents list is not empty
+            if not documents:
+                raise HTTPException(
+                    status_code=404, detail="No document found for the given ID"
+                )
 
-        return process_documents(documents)
+        context = process_documents(documents)
+        if document_context_cache is not None:
+            document_context_cache.set(
+                id, zlib.compress(context.encode("utf-8")), [id], snapshot
+            )
+        return context
     except HTTPException as http_exc:
         logger.error(
             "HTTP Exception in load_document_context | Status: %d | Detail: %s",
@@ -968,15 +2002,26 @@ async def embed_file_upload(
     entity_id: str = Form(None),
 ):
     user_id = get_user_id(request, entity_id)
-    temp_file_path = os.path.join(RAG_UPLOAD_DIR, uploaded_file.filename)
+    source_path = os.path.join(RAG_UPLOAD_DIR, uploaded_file.filename)
 
-    save_upload_file_sync(uploaded_file, temp_file_path)
+    upload = await receive_upload_file(uploaded_file, RAG_UPLOAD_DIR)
+
+    reused = await reuse_identical_upload(upload.sha256, file_id, user_id, source_path)
+    if reused:
+        await upload.close()
+        return {
+            "status": True,
+            "message": reused,
+            "file_id": file_id,
+            "filename": uploaded_file.filename,
+            "known_type": True,
+        }
 
     try:
-        data, known_type, file_ext = await load_file_content(
-            uploaded_file.filename,
+        data, known_type, file_ext, processed = await load_upload_for_ingest(
+            upload,
             uploaded_file.content_type,
-            temp_file_path,
+            source_path,
             request.app.state.thread_pool,
         )
 
@@ -984,8 +2029,10 @@ async def embed_file_upload(
             data,
             file_id,
             user_id,
-            clean_content=file_ext == "pdf",
+            clean_content=file_ext == "pdf" and not processed,
             executor=request.app.state.thread_pool,
+            presplit=processed,
+            file_sha256=upload.sha256,
         )
 
         if not result:
@@ -1012,7 +2059,7 @@ async def embed_file_upload(
             detail=f"Error during file processing: {str(e)}",
         )
     finally:
-        os.remove(temp_file_path)
+        await upload.close()
 
     return {
         "status": True,
@@ -1036,25 +2083,7 @@ async def query_embeddings_by_file_ids(request: Request, body: QueryMultipleBody
                 )
                 body.search_type = SearchType.semantic
 
-        if use_hybrid and body.search_type == SearchType.bm25:
-            # Pure BM25 search
-            try:
-                documents = await asyncio.wait_for(
-                    hybrid_search_service.bm25_search(
-                        body.query,
-                        k=body.k,
-                        filter_dict={"file_id": {"$in": body.file_ids}}
-                    ),
-                    timeout=HYBRID_SEARCH_TIMEOUT
-                )
-            except asyncio.TimeoutError:
-                logger.error(f"BM25 search timed out after {HYBRID_SEARCH_TIMEOUT}s")
-                raise HTTPException(
-                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
-                    detail="Search operation timed out"
-                )
-
-        elif use_hybrid and body.search_type == SearchType.hybrid:
+        if use_hybrid and body.search_type == SearchType.hybrid:
             logger.info(f"=== HYBRID SEARCH CONFIG ===")
             logger.info(f"Query: {body.query[:50]}...")
             logger.info(f"Semantic weight: {body.semantic_weight}")
@@ -1063,75 +2092,15 @@ async def query_embeddings_by_file_ids(request: Request, body: QueryMultipleBody
             logger.info(f"K expanded: {int(body.k * HYBRID_EXPANSION_FACTOR)}")
             logger.info(f"===========================")
 
-            # Hybrid search
-            embedding = get_cached_query_embedding(body.query)  # Use improved cache
-            k_expanded = int(body.k * HYBRID_EXPANSION_FACTOR)
-
-            # Semantic search
-            if isinstance(vector_store, AsyncPgVector):
-                semantic_task = vector_store.asimilarity_search_with_score_by_vector(
-                    embedding,
-                    k=k_expanded,
-                    filter={"file_id": {"$in": body.file_ids}},
-                    executor=request.app.state.thread_pool,
-                )
-            else:
-                semantic_task = asyncio.create_task(
-                    asyncio.to_thread(
-                        vector_store.similarity_search_with_score_by_vector,
-                        embedding,
-                        k=k_expanded,
-                        filter={"file_id": {"$in": body.file_ids}}
-                    )
-                )
-
-            # BM25 search
-            bm25_task = hybrid_search_service.bm25_search(
-                body.query,
-                k=k_expanded,
-                filter_dict={"file_id": {"$in": body.file_ids}}
-            )
-
-            try:
-                # Wait for both with timeout
-                semantic_results, bm25_results = await asyncio.wait_for(
-                    asyncio.gather(semantic_task, bm25_task),
-                    timeout=HYBRID_SEARCH_TIMEOUT
-                )
-
-                # Combine using RRF
-                documents = hybrid_search_service.reciprocal_rank_fusion(
-                    semantic_results,
-                    bm25_results,
-                    k=HYBRID_FUSION_K,
-                    semantic_weight=body.semantic_weight
-                )[:body.k]
-
-            except asyncio.TimeoutError:
-                logger.error(f"Hybrid search timed out after {HYBRID_SEARCH_TIMEOUT}s")
-                raise HTTPException(
-                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
-                    detail="Search operation timed out"
-                )
-
-        else:
-            # Default semantic search
-            embedding = get_cached_query_embedding(body.query)  # Use improved cache
-
-            if isinstance(vector_store, AsyncPgVector):
-                documents = await vector_store.asimilarity_search_with_score_by_vector(
-                    embedding,
-                    k=body.k,
-                    filter={"file_id": {"$in": body.file_ids}},
-                    executor=request.app.state.thread_pool,
-                )
-            else:
-                documents = vector_store.similarity_search_with_score_by_vector(
-                    embedding, k=body.k, filter={"file_id": {"$in": body.file_ids}}
-                )
-
-        # Clean metadata before returning
-        documents = [clean_metadata_for_response(doc, score) for doc, score in documents]
+        documents = await cached_search_documents(
+            request,
+            body.query,
+            file_ids=body.file_ids,
+            filter_dict={"file_id": {"$in": body.file_ids}},
+            k=body.k,
+            search_type=body.search_type,
+            semantic_weight=body.semantic_weight
+        )
 
         # Ensure documents list is not empty
         if not documents:
@@ -1174,17 +2143,21 @@ async def extract_text_from_file(
     user_id = get_user_id(request, entity_id)
     temp_base_path = os.path.join(RAG_UPLOAD_DIR, user_id)
     os.makedirs(temp_base_path, exist_ok=True)
-    temp_file_path = os.path.join(RAG_UPLOAD_DIR, user_id, file.filename)
 
-    await save_upload_file_async(file, temp_file_path)
+    upload = await receive_upload_file(file, temp_base_path)
 
     try:
-        data, known_type, file_ext = await load_file_content(
-            file.filename,
-            file.content_type,
-            temp_file_path,
-            request.app.state.thread_pool,
-        )
+        direct = _direct_text_documents(upload, os.path.join(temp_base_path, file.filename))
+        if direct is not None:
+            data, file_ext = direct
+            known_type = True
+        else:
+            data, known_type, file_ext = await load_file_content(
+                file.filename,
+                file.content_type,
+                await upload.to_path(),
+                request.app.state.thread_pool,
+            )
 
         # Extract text content from loaded documents
         text_content = extract_text_from_documents(data, file_ext)
@@ -1221,7 +2194,7 @@ async def extract_text_from_file(
                 detail=f"Error during text extraction: {str(e)}",
             )
     finally:
-        await cleanup_temp_file_async(temp_file_path)
+        await upload.close()
 
 
 @router.get("/search/metrics")
@@ -1233,5 +2206,19 @@ async def get_search_metrics():
     return {
         "enabled": True,
         "initialized": hybrid_search_service._initialized,
-        "metrics": hybrid_search_service.get_metrics() if hybrid_search_service._initialized else {}
+        "status": hybrid_search_service.status,
+        "metrics": hybrid_search_service.get_metrics() if hybrid_search_service._initialized else {},
+        "embedding_cache": embedding_cache.stats(),
+        "persistent_embedding_cache": (
+            persistent_embedding_store.stats() if persistent_embedding_store else None
+        ),
+        "query_embedding_batching": (
+            query_embedding_batcher.stats() if query_embedding_batcher else None
+        ),
+        "ingest_embedding": ingest_embedder.stats(),
+        "ingest_jobs": ingest_jobs.stats(),
+        "ingest_embedding_reuse": embedding_reuse.stats() if embedding_reuse else None,
+        "query_result_cache": query_result_cache.stats() if query_result_cache else None,
+        "document_context_cache": document_context_cache.stats() if document_context_cache else None,
+        "cache_invalidation": cache_invalidation.stats()
     }
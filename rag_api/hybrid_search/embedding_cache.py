@@ -0,0 +1,286 @@
+# app/services/embedding_cache.py
+import time
+import asyncio
+import hashlib
+import logging
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingCache:
+    """
+    LRU cache for query embeddings with normalization.
+
+    Embeddings are stored as packed float32 arrays (4 bytes per dimension)
+    and the cache is bounded by entry count, total bytes and TTL.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 0
+    ):
+        # key -> (expires_at, packed embedding); order is recency
+        self.cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _normalize_query(self, query: str) -> str:
+        """Normalize query for better cache hits"""
+        # Remove extra whitespace
+        normalized = ' '.join(query.split())
+        # Convert to lowercase
+        normalized = normalized.lower()
+        # Fix common encoding issues
+        normalized = normalized.encode('utf-8', errors='ignore').decode('utf-8')
+        return normalized
+
+    def _get_cache_key(self, query: str) -> str:
+        """Generate cache key from normalized query"""
+        normalized = self._normalize_query(query)
+        return hashlib.md5(normalized.encode('utf-8')).hexdigest()
+
+    def _remove(self, key: str):
+        _, vector = self.cache.pop(key)
+        self.current_bytes -= vector.itemsize * len(vector)
+
+    def get(self, query: str) -> Optional[List[float]]:
+        """Get embedding from cache"""
+        key = self._get_cache_key(query)
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, vector = entry
+        if expires_at and expires_at < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        # Move to end (most recently used)
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return vector.tolist()
+
+    def set(self, query: str, embedding: List[float]):
+        """Store embedding in cache"""
+        key = self._get_cache_key(query)
+        vector = array('f', embedding)
+        size = vector.itemsize * len(vector)
+        if size > self.max_bytes:
+            return
+
+        if key in self.cache:
+            self._remove(key)
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        self.cache[key] = (expires_at, vector)
+        self.current_bytes += size
+
+        # Evict least recently used entries until both budgets hold
+        while len(self.cache) > self.max_size or self.current_bytes > self.max_bytes:
+            oldest = next(iter(self.cache))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self):
+        """Clear the cache"""
+        self.cache.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> Dict:
+        """Return cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.cache),
+            'bytes': self.current_bytes,
+            'max_entries': self.max_size,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class PostgresEmbeddingStore:
+    """
+    Second-tier query embedding cache kept in a Postgres table.
+
+    Shared by every worker process and preserved across restarts. Rows are
+    keyed by embedding model plus normalized-query hash, and embeddings are
+    stored as packed float32 bytes.
+    """
+
+    def __init__(self, pool_getter, model: str, ttl: float = 0):
+        self._pool_getter = pool_getter
+        self.model = model
+        self.ttl = ttl
+        self._table_ready = False
+        self._pending_writes = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def _ensure_table(self, conn):
+        if self._table_ready:
+            return
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS query_embedding_cache (
+                model TEXT NOT NULL,
+                query_hash TEXT NOT NULL,
+                embedding BYTEA NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (model, query_hash)
+            );
+        """)
+        if self.ttl:
+            await conn.execute("""
+                DELETE FROM query_embedding_cache
+                WHERE created_at < now() - make_interval(secs => $1::float8)
+            """, float(self.ttl))
+        self._table_ready = True
+
+    async def get(self, key: str) -> Optional[List[float]]:
+        """Look up an embedding by cache key; errors are logged and treated as misses"""
+        try:
+            pool = await self._pool_getter()
+            async with pool.acquire() as conn:
+                await self._ensure_table(conn)
+                data = await conn.fetchval("""
+                    SELECT embedding FROM query_embedding_cache
+                    WHERE model = $1 AND query_hash = $2
+                    AND ($3::float8 = 0 OR created_at >= now() - make_interval(secs => $3::float8))
+                """, self.model, key, float(self.ttl))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Persistent embedding cache lookup failed: {e}")
+            return None
+
+        if data is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        vector = array('f')
+        vector.frombytes(data)
+        return vector.tolist()
+
+    async def _write(self, key: str, embedding: List[float]):
+        try:
+            pool = await self._pool_getter()
+            async with pool.acquire() as conn:
+                await self._ensure_table(conn)
+                await conn.execute("""
+                    INSERT INTO query_embedding_cache (model, query_hash, embedding)
+                    VALUES ($1, $2, $3)
+                    ON CONFLICT (model, query_hash)
+                    DO UPDATE SET embedding = EXCLUDED.embedding, created_at = now()
+                """, self.model, key, array('f', embedding).tobytes())
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Persistent embedding cache write failed: {e}")
+
+    def set(self, key: str, embedding: List[float]):
+        """Write an embedding in the background so the caller is not delayed"""
+        task = asyncio.ensure_future(self._write(key, embedding))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    def stats(self) -> Dict:
+        """Return cache counters"""
+        return {
+            'model': self.model,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+        }
+
+
+class QueryEmbeddingBatcher:
+    """
+    Coalesce concurrent query embeddings into batched provider calls.
+
+    Requests arriving within `window` seconds (or until `max_batch_size`
+    is reached) are sent as one embed_documents call and the vectors are
+    fanned back out to the waiting callers.
+    """
+
+    def __init__(self, embed_batch, window: float = 0.005, max_batch_size: int = 64):
+        # async callable: List[str] -> List[List[float]]
+        self._embed_batch = embed_batch
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending = []
+        self._flush_handle = None
+        self._running = set()
+
+        self.requests = 0
+        self.batches = 0
+
+    async def embed(self, text: str) -> List[float]:
+        """Queue a text for the next batch and wait for its vector"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        self.batches += 1
+        try:
+            vectors = await self._embed_batch([text for text, _ in batch])
+            if len(vectors) != len(batch):
+                raise ValueError(
+                    f"Embedding provider returned {len(vectors)} vectors for {len(batch)} queries"
+                )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self) -> Dict:
+        """Return batching counters"""
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'avg_batch_size': self.requests / self.batches if self.batches else 0,
+        }
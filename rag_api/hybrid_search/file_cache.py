@@ -0,0 +1,126 @@
+# app/services/file_cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+
+class FileScopedCache:
+    """
+    LRU cache whose entries depend on one or more file_ids.
+
+    Entries are dropped when any of their files is invalidated (re-embed,
+    delete). Each invalidation is stamped with a counter, which keeps a
+    computation that started before it from storing its now-stale result.
+    Only the latest `max_generations` stamps are kept; files whose stamp was
+    forgotten count as invalidated at the newest forgotten stamp, which at
+    worst skips storing a result.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 0, max_generations: int = 10000):
+        # key -> (expires_at, file_ids, value); order is recency
+        self.cache: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_generations = max(1, max_generations)
+        self._keys_by_file: Dict[str, set] = {}
+        # file_id -> counter value of its last invalidation, oldest first
+        self._generations: "OrderedDict[str, int]" = OrderedDict()
+        self._generation_clock = 0
+        self._generation_floor = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _remove(self, key: Hashable):
+        _, file_ids, _ = self.cache.pop(key)
+        for file_id in file_ids:
+            keys = self._keys_by_file.get(file_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_file[file_id]
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value"""
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, _, value = entry
+        if expires_at and expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def snapshot(self) -> int:
+        """Capture the invalidation counter before computing a value"""
+        return self._generation_clock
+
+    def _generation(self, file_id: str) -> int:
+        return self._generations.get(file_id, self._generation_floor)
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        file_ids: Iterable[str],
+        snapshot: Optional[int] = None
+    ):
+        """Store a value; skipped if one of its files changed since `snapshot`"""
+        file_ids = tuple(file_ids)
+        if snapshot is not None and any(self._generation(f) > snapshot for f in file_ids):
+            return
+
+        if key in self.cache:
+            self._remove(key)
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        self.cache[key] = (expires_at, file_ids, value)
+        for file_id in file_ids:
+            self._keys_by_file.setdefault(file_id, set()).add(key)
+
+        while len(self.cache) > self.max_size:
+            self._remove(next(iter(self.cache)))
+            self.evictions += 1
+
+    def invalidate_files(self, file_ids: Iterable[str]):
+        """Drop every entry that depends on any of the given files"""
+        self._generation_clock += 1
+        for file_id in file_ids:
+            self._generations[file_id] = self._generation_clock
+            self._generations.move_to_end(file_id)
+            for key in list(self._keys_by_file.get(file_id, ())):
+                if key in self.cache:
+                    self._remove(key)
+                    self.invalidations += 1
+
+        while len(self._generations) > self.max_generations:
+            _, generation = self._generations.popitem(last=False)
+            self._generation_floor = generation
+
+    def clear(self):
+        """Clear the cache; results computed before this are not stored"""
+        self.cache.clear()
+        self._keys_by_file.clear()
+        self._generation_clock += 1
+        self._generations.clear()
+        self._generation_floor = self._generation_clock
+
+    def stats(self) -> Dict:
+        """Return cache counters"""
+        return {
+            'entries': len(self.cache),
+            'max_entries': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
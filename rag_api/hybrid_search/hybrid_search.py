@@ -6,12 +6,116 @@ import hashlib
 import time
 import json
 import re
+import random
+import uuid
+from contextlib import asynccontextmanager
 from typing import List, Dict, Optional, Tuple
 from sqlalchemy import text
 from langchain_core.documents import Document
 import asyncpg
 
+from app.services.migrations import MigrationRunner, IndexMigration, BackfillMigration
+
 logger = logging.getLogger(__name__)
+# Structured (one JSON object per line) search diagnostics
+explain_logger = logging.getLogger(f"{__name__}.explain")
+
+
+def parse_metadata(value) -> Dict:
+    """Normalize a cmetadata value returned by asyncpg into a dict"""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            value = {}
+    if not isinstance(value, dict):
+        value = {}
+    return value
+
+
+class ChunkWriter:
+    """Insert chunk batches into langchain_pg_embedding over an open transaction"""
+
+    def __init__(self, conn, insert_sql: str, collection_id, encode_vector):
+        self._conn = conn
+        self._insert_sql = insert_sql
+        self._collection_id = collection_id
+        self._encode_vector = encode_vector
+        self.rows_written = 0
+
+    async def write(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict],
+        custom_ids: List[str]
+    ) -> int:
+        """Insert one batch with a single executemany; returns the row count"""
+        await self._conn.executemany(self._insert_sql, [
+            (
+                uuid.uuid4(),
+                self._collection_id,
+                self._encode_vector(embedding),
+                document,
+                json.dumps(metadata, default=str),
+                custom_id,
+            )
+            for document, embedding, metadata, custom_id in zip(
+                texts, embeddings, metadatas, custom_ids
+            )
+        ])
+        self.rows_written += len(texts)
+        return len(texts)
+
+    def savepoint(self):
+        """Nested transaction: a failure inside rolls back only its own writes"""
+        return self._conn.transaction()
+
+    async def delete(self, row_ids: List) -> int:
+        """Delete rows by primary key"""
+        if not row_ids:
+            return 0
+        result = await self._conn.execute(
+            "DELETE FROM langchain_pg_embedding WHERE uuid = ANY($1::uuid[])",
+            list(row_ids)
+        )
+        return int(result.split()[-1])
+
+    async def stamp_file(self, file_id: str, file_sha256: Optional[str]) -> int:
+        """Set (or clear, when None) the file_sha256 of every chunk of a file"""
+        result = await self._conn.execute("""
+            UPDATE langchain_pg_embedding
+            SET cmetadata = (CASE
+                WHEN $2::text IS NULL THEN cmetadata::jsonb - 'file_sha256'
+                ELSE cmetadata::jsonb || jsonb_build_object('file_sha256', $2::text)
+            END)::json
+            WHERE cmetadata->>'file_id' = $1
+            AND collection_id = $3
+        """, file_id, file_sha256, self._collection_id)
+        return int(result.split()[-1])
+
+    async def update_positions(
+        self,
+        row_ids: List,
+        chunk_indexes: List[int],
+        total_chunks: int,
+        as_text: bool = False
+    ) -> int:
+        """Rewrite chunk_index/total_chunks metadata of existing rows, in one statement"""
+        if not row_ids:
+            return 0
+        value_type = "text" if as_text else "int"
+        result = await self._conn.execute(f"""
+            UPDATE langchain_pg_embedding AS e
+            SET cmetadata = (e.cmetadata::jsonb || jsonb_build_object(
+                'chunk_index', u.chunk_index::{value_type},
+                'total_chunks', $3::int::{value_type}
+            ))::json
+            FROM unnest($1::uuid[], $2::int[]) AS u(row_id, chunk_index)
+            WHERE e.uuid = u.row_id
+        """, list(row_ids), list(chunk_indexes), total_chunks)
+        return int(result.split()[-1])
+
 
 class HybridSearchService:
     """Service for hybrid search combining semantic and BM25 search"""
@@ -22,12 +126,27 @@ class HybridSearchService:
         self._dsn = None
         self._pool = None
         self._pool_lock = asyncio.Lock()
+        self._vector_codec = False
+        self._diagnostics_sample_rate = None
+        self.migrations = MigrationRunner(self.get_pool)
+        self._ingest_indexes_registered = False
+        self._writer_slots = None
+        self._soft_delete = None
+        self._tombstones_ready = False
+        self._tombstone_lock = asyncio.Lock()
+        self._purge_task = None
+        self._purged_since_vacuum = 0
+        self._purged_since_reindex = 0
 
         # Performance metrics
         self.metrics = {
             'bm25_searches': 0,
             'bm25_total_time': 0,
-            'fusion_operations': 0
+            'fusion_operations': 0,
+            'tombstones_purged': 0,
+            'tombstone_rows_purged': 0,
+            'vacuums': 0,
+            'reindexes': 0
         }
 
     def _get_dsn(self):
@@ -37,22 +156,398 @@ class HybridSearchService:
             self._dsn = DSN
         return self._dsn
 
+    async def _init_connection(self, conn):
+        """Register the pgvector binary codec on every pooled connection"""
+        try:
+            from pgvector.asyncpg import register_vector
+            await register_vector(conn)
+            self._vector_codec = True
+        except Exception as e:
+            self.logger.warning(f"pgvector codec not registered, using text encoding: {e}")
+
     async def get_pool(self):
         """Get or create connection pool with thread safety"""
         if self._pool is None:
             async with self._pool_lock:
                 if self._pool is None:  # Double-check pattern
+                    from app.config import HYBRID_POOL_MIN_SIZE, HYBRID_POOL_MAX_SIZE
                     dsn = self._get_dsn()
                     self._pool = await asyncpg.create_pool(
                         dsn=dsn,
-                        min_size=2,
-                        max_size=10,
+                        min_size=HYBRID_POOL_MIN_SIZE,
+                        max_size=HYBRID_POOL_MAX_SIZE,
                         max_inactive_connection_lifetime=300,
-                        command_timeout=60
+                        command_timeout=60,
+                        init=self._init_connection
                     )
                     self.logger.info("Created persistent connection pool for hybrid search")
         return self._pool
 
+    def _maintenance_timeout(self) -> float:
+        """Client timeout for DDL and maintenance commands, which outlast command_timeout"""
+        from app.config import HYBRID_MAINTENANCE_TIMEOUT
+        return HYBRID_MAINTENANCE_TIMEOUT
+
+    def _vector_param(self, index: int) -> str:
+        """SQL placeholder for an embedding parameter"""
+        if self._vector_codec:
+            return f"${index}::vector"
+        return f"${index}::text::vector"
+
+    def _encode_vector(self, embedding: List[float]):
+        """Encode an embedding for the placeholder returned by _vector_param"""
+        if self._vector_codec:
+            return embedding
+        return "[" + ",".join(str(float(x)) for x in embedding) + "]"
+
+    def supports_filter(self, filter_dict: Optional[Dict]) -> bool:
+        """Whether a metadata filter can be pushed down into SQL"""
+        if not filter_dict:
+            return True
+        for key, value in filter_dict.items():
+            if not re.fullmatch(r'[A-Za-z0-9_]+', key):
+                return False
+            if isinstance(value, dict):
+                if set(value.keys()) == {"$in"}:
+                    if not all(isinstance(v, str) for v in value["$in"]):
+                        return False
+                    continue
+                if set(value.keys()) != {"$eq"}:
+                    return False
+                value = value["$eq"]
+            if not isinstance(value, str):
+                return False
+        return True
+
+    def _build_filter_conditions(
+        self,
+        filter_dict: Optional[Dict],
+        params: List,
+        alias: str = ""
+    ) -> List[str]:
+        """
+        Translate a metadata filter into SQL conditions.
+        Values are appended to params; placeholders continue from len(params).
+        """
+        conditions = []
+        if not filter_dict:
+            return conditions
+
+        column = f"{alias}.cmetadata" if alias else "cmetadata"
+        for key, value in filter_dict.items():
+            if isinstance(value, dict) and "$in" in value:
+                # One array parameter keeps the statement shape independent of list size
+                params.append(list(value["$in"]))
+                conditions.append(f"{column}->>'{key}' = ANY(${len(params)}::text[])")
+                continue
+            if isinstance(value, dict):
+                value = value["$eq"]
+            params.append(value)
+            conditions.append(f"{column}->>'{key}' = ${len(params)}")
+        return conditions
+
+    def _soft_delete_enabled(self) -> bool:
+        if self._soft_delete is None:
+            from app.config import SOFT_DELETE
+            self._soft_delete = SOFT_DELETE
+        return self._soft_delete
+
+    async def ensure_tombstones(self):
+        """Create the tombstone table and start the purge worker (SOFT_DELETE only)"""
+        if self._tombstones_ready or not self._soft_delete_enabled():
+            return
+        async with self._tombstone_lock:
+            if self._tombstones_ready:
+                return
+            pool = await self.get_pool()
+            async with pool.acquire() as conn:
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS rag_file_tombstones (
+                        collection_id UUID NOT NULL,
+                        file_id TEXT NOT NULL,
+                        deleted_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                        PRIMARY KEY (collection_id, file_id)
+                    );
+                """)
+            self._tombstones_ready = True
+            self._purge_task = asyncio.ensure_future(self._purge_loop())
+
+    def _tombstone_condition(self, alias: str = "") -> Optional[str]:
+        """SQL condition hiding rows of tombstoned files, or None when soft delete is off"""
+        if not self._tombstones_ready:
+            return None
+        table = alias or "langchain_pg_embedding"
+        return f"""NOT EXISTS (
+            SELECT 1 FROM rag_file_tombstones t
+            WHERE t.collection_id = {table}.collection_id
+            AND t.file_id = {table}.cmetadata->>'file_id'
+        )"""
+
+    async def tombstone_files(self, file_ids: List[str], collection_name: str) -> List[str]:
+        """
+        Mark files deleted without touching their rows; returns the file_ids
+        that have stored chunks. Rows are purged later by the background worker.
+        """
+        await self.ensure_tombstones()
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("""
+                WITH requested AS (
+                    SELECT DISTINCT f.file_id, c.uuid AS collection_id
+                    FROM unnest($1::text[]) AS f(file_id), langchain_pg_collection c
+                    WHERE c.name = $2
+                    AND EXISTS (
+                        SELECT 1 FROM langchain_pg_embedding e
+                        WHERE e.cmetadata->>'file_id' = f.file_id
+                        AND e.collection_id = c.uuid
+                    )
+                ),
+                marked AS (
+                    INSERT INTO rag_file_tombstones (collection_id, file_id)
+                    SELECT collection_id, file_id FROM requested
+                    ON CONFLICT DO NOTHING
+                )
+                SELECT file_id FROM requested
+            """, list(file_ids), collection_name)
+        return [row['file_id'] for row in rows]
+
+    async def tombstoned_file_ids(self, file_ids: List[str], collection_name: str) -> set:
+        """Return which of the given files are tombstoned in the collection"""
+        await self.ensure_tombstones()
+        file_ids = list({file_id for file_id in file_ids if file_id is not None})
+        if not self._tombstones_ready or not file_ids:
+            return set()
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT file_id FROM rag_file_tombstones
+                WHERE collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = $1)
+                AND file_id = ANY($2::text[])
+            """, collection_name, file_ids)
+        return {row['file_id'] for row in rows}
+
+    async def drop_tombstoned(
+        self,
+        results: List[Tuple[Document, float]],
+        collection_name: str
+    ) -> List[Tuple[Document, float]]:
+        """Filter tombstoned files out of results that could not be filtered in SQL"""
+        tombstoned = await self.tombstoned_file_ids(
+            [doc.metadata.get('file_id') for doc, _ in results], collection_name
+        )
+        if not tombstoned:
+            return results
+        return [(doc, score) for doc, score in results if doc.metadata.get('file_id') not in tombstoned]
+
+    async def _purge_tombstoned_file(self, conn, collection_id, file_id: str, batch_size: int) -> int:
+        """
+        Delete a tombstoned file's rows in batches, then its tombstone. Each
+        batch locks the tombstone row first and stops if it is gone: purge_file
+        removed it and the file may have been ingested again since.
+        """
+        deleted = 0
+        while True:
+            async with conn.transaction():
+                tombstoned = await conn.fetchval("""
+                    SELECT 1 FROM rag_file_tombstones
+                    WHERE collection_id = $1 AND file_id = $2
+                    FOR UPDATE
+                """, collection_id, file_id)
+                if not tombstoned:
+                    return deleted
+
+                result = await conn.execute("""
+                    DELETE FROM langchain_pg_embedding
+                    WHERE uuid IN (
+                        SELECT uuid FROM langchain_pg_embedding
+                        WHERE cmetadata->>'file_id' = $1 AND collection_id = $2
+                        LIMIT $3
+                    )
+                """, file_id, collection_id, batch_size)
+                count = int(result.split()[-1])
+                deleted += count
+
+                if count < batch_size:
+                    await conn.execute("""
+                        DELETE FROM rag_file_tombstones
+                        WHERE collection_id = $1 AND file_id = $2
+                    """, collection_id, file_id)
+                    self.metrics['tombstones_purged'] += 1
+                    return deleted
+
+            # Leave room for foreground traffic between batches
+            await asyncio.sleep(0.05)
+
+    async def purge_file(self, file_id: str, collection_name: str) -> int:
+        """
+        Synchronously purge a tombstoned file (before it is ingested again, so
+        the new rows are not hidden). Returns the number of rows removed.
+        """
+        if not self._soft_delete_enabled():
+            return 0
+        await self.ensure_tombstones()
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                collection_id = await conn.fetchval("""
+                    DELETE FROM rag_file_tombstones
+                    WHERE file_id = $1
+                    AND collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = $2)
+                    RETURNING collection_id
+                """, file_id, collection_name)
+                if collection_id is None:
+                    return 0
+                result = await conn.execute("""
+                    DELETE FROM langchain_pg_embedding
+                    WHERE cmetadata->>'file_id' = $1 AND collection_id = $2
+                """, file_id, collection_id)
+        purged = int(result.split()[-1])
+        self.metrics['tombstone_rows_purged'] += purged
+        self.logger.info(f"Purged {purged} tombstoned chunks of file {file_id} before re-ingest")
+        return purged
+
+    async def purge_tombstones(self, batch_size: int = 5000) -> int:
+        """
+        Remove the rows of tombstoned files in batches, then their tombstones.
+        Only one process purges at a time (advisory lock). Returns rows removed.
+        """
+        pool = await self.get_pool()
+        purged = 0
+        async with pool.acquire() as conn:
+            if not await conn.fetchval("SELECT pg_try_advisory_lock(hashtext('rag_tombstone_purge'))"):
+                return 0
+            try:
+                tombstones = await conn.fetch("""
+                    SELECT collection_id, file_id FROM rag_file_tombstones
+                    ORDER BY deleted_at
+                """)
+                for tombstone in tombstones:
+                    purged += await self._purge_tombstoned_file(
+                        conn, tombstone['collection_id'], tombstone['file_id'], batch_size
+                    )
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock(hashtext('rag_tombstone_purge'))")
+
+            self.metrics['tombstone_rows_purged'] += purged
+            self._purged_since_vacuum += purged
+            self._purged_since_reindex += purged
+            await self._compact(conn)
+
+        return purged
+
+    async def _compact(self, conn):
+        """VACUUM / REINDEX once enough rows were purged since the last run"""
+        from app.config import TOMBSTONE_VACUUM_THRESHOLD, TOMBSTONE_REINDEX_THRESHOLD
+
+        if TOMBSTONE_VACUUM_THRESHOLD and self._purged_since_vacuum >= TOMBSTONE_VACUUM_THRESHOLD:
+            self.logger.info(f"Vacuuming langchain_pg_embedding after purging {self._purged_since_vacuum} rows")
+            # Reset first: a failing VACUUM must not be retried on every purge cycle
+            self._purged_since_vacuum = 0
+            await conn.execute(
+                "VACUUM (ANALYZE) langchain_pg_embedding", timeout=self._maintenance_timeout()
+            )
+            self.metrics['vacuums'] += 1
+
+        # idx_search_vector only exists once hybrid search built it
+        if (
+            TOMBSTONE_REINDEX_THRESHOLD
+            and self._purged_since_reindex >= TOMBSTONE_REINDEX_THRESHOLD
+            and self.migrations.is_complete("idx_search_vector")
+        ):
+            self.logger.info(f"Rebuilding idx_search_vector after purging {self._purged_since_reindex} rows")
+            self._purged_since_reindex = 0
+            try:
+                await conn.execute(
+                    "REINDEX INDEX CONCURRENTLY idx_search_vector", timeout=self._maintenance_timeout()
+                )
+            except Exception as e:
+                self.logger.error(f"Rebuilding idx_search_vector failed: {e}")
+            else:
+                self.metrics['reindexes'] += 1
+
+    async def _purge_loop(self):
+        from app.config import TOMBSTONE_PURGE_INTERVAL, TOMBSTONE_PURGE_BATCH_SIZE
+
+        while True:
+            try:
+                purged = await self.purge_tombstones(TOMBSTONE_PURGE_BATCH_SIZE)
+                if purged:
+                    self.logger.info(f"Purged {purged} tombstoned chunks")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Tombstone purge failed: {e}")
+            await asyncio.sleep(TOMBSTONE_PURGE_INTERVAL)
+
+    async def vector_search(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter_dict: Optional[Dict] = None,
+        collection_name: Optional[str] = None,
+        distance_operator: str = "<=>"
+    ) -> List[Tuple[Document, float]]:
+        """
+        Perform pgvector KNN search directly on the asyncpg pool
+        """
+        if not self.supports_filter(filter_dict):
+            raise ValueError(f"Filter cannot be pushed down to SQL: {filter_dict}")
+
+        pool = await self.get_pool()
+
+        params = [self._encode_vector(embedding), k]
+        conditions = []
+        if collection_name:
+            params.append(collection_name)
+            conditions.append(
+                f"e.collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = ${len(params)})"
+            )
+        conditions.extend(self._build_filter_conditions(filter_dict, params, alias="e"))
+        await self.ensure_tombstones()
+        tombstone_condition = self._tombstone_condition("e")
+        if tombstone_condition:
+            conditions.append(tombstone_condition)
+
+        where_clause = ""
+        if conditions:
+            where_clause = "WHERE " + " AND ".join(conditions)
+
+        query_sql = f"""
+            SELECT
+                e.document,
+                e.cmetadata,
+                e.custom_id,
+                e.embedding {distance_operator} {self._vector_param(1)} AS distance
+            FROM
+                langchain_pg_embedding e
+            {where_clause}
+            ORDER BY distance
+            LIMIT $2
+        """
+
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(query_sql, *params)
+
+        documents = []
+        for row in rows:
+            metadata = parse_metadata(row['cmetadata'])
+            metadata['custom_id'] = row['custom_id']
+            doc = Document(page_content=row['document'], metadata=metadata)
+            documents.append((doc, float(row['distance'])))
+
+        return documents
+
+    def _backfill_batch_size(self) -> int:
+        from app.config import HYBRID_BACKFILL_BATCH_SIZE
+        return HYBRID_BACKFILL_BATCH_SIZE
+
+    @property
+    def status(self) -> str:
+        """'disabled' before initialize, then 'initializing' until background migrations finish"""
+        if not self._initialized:
+            return 'disabled'
+        return self.migrations.status
+
     async def initialize(self):
         """Initialize full-text search capabilities in PostgreSQL"""
         if self._initialized:
@@ -80,18 +575,6 @@ class HybridSearchService:
                     ) STORED;
                 """)
 
-                # Create GIN index for fast full-text search
-                await conn.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_search_vector
-                    ON langchain_pg_embedding USING GIN (search_vector);
-                """)
-
-                # Create index on file_id for faster filtering
-                await conn.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_file_id
-                    ON langchain_pg_embedding ((cmetadata->>'file_id'));
-                """)
-
                 # Create helper function for OR queries
                 await conn.execute("""
                     CREATE OR REPLACE FUNCTION text_to_or_tsquery(query_text text)
@@ -127,14 +610,43 @@ class HybridSearchService:
                     $$ LANGUAGE plpgsql IMMUTABLE;
                 """)
 
-                # Update existing rows to populate search_text from document
-                affected = await conn.execute("""
-                    UPDATE langchain_pg_embedding
-                    SET search_text = document
-                    WHERE search_text IS NULL;
-                """)
-
-                self.logger.info(f"Updated {affected} existing rows with search_text")
+            # Indexes and the search_text backfill run in the background;
+            # search_vector already covers `document`, so BM25 works meanwhile
+            self.migrations.register(IndexMigration(
+                "idx_search_vector",
+                "idx_search_vector",
+                """
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_search_vector
+                ON langchain_pg_embedding USING GIN (search_vector);
+                """,
+                timeout=self._maintenance_timeout()
+            ))
+            self._register_file_id_index()
+            self.migrations.register(BackfillMigration(
+                "backfill_search_text",
+                """
+                WITH batch AS (
+                    SELECT uuid FROM langchain_pg_embedding
+                    WHERE uuid > $1::uuid
+                    ORDER BY uuid
+                    LIMIT $2
+                ),
+                updated AS (
+                    UPDATE langchain_pg_embedding e
+                    SET search_text = e.document
+                    FROM batch b
+                    WHERE e.uuid = b.uuid AND e.search_text IS NULL
+                    RETURNING 1
+                )
+                SELECT
+                    (SELECT max(uuid)::text FROM batch) AS last_key,
+                    (SELECT count(*) FROM batch) AS scanned,
+                    (SELECT count(*) FROM updated) AS updated
+                """,
+                initial_key="00000000-0000-0000-0000-000000000000",
+                batch_size=self._backfill_batch_size()
+            ))
+            self.migrations.start()
 
             self._initialized = True
             self.logger.info("Hybrid search initialized successfully with Spanish language support")
@@ -157,15 +669,67 @@ class HybridSearchService:
         cleaned = ' '.join(cleaned.split())
         return cleaned.lower()
 
+    def should_run_diagnostics(self, force: bool = False) -> bool:
+        """Decide whether a search should collect diagnostics (forced or sampled)"""
+        if force:
+            return True
+        if self._diagnostics_sample_rate is None:
+            from app.config import HYBRID_DIAGNOSTICS_SAMPLE_RATE
+            self._diagnostics_sample_rate = HYBRID_DIAGNOSTICS_SAMPLE_RATE
+        return random.random() < self._diagnostics_sample_rate
+
+    async def _bm25_diagnostics(
+        self,
+        conn,
+        query: str,
+        cleaned_query: str,
+        filter_dict: Optional[Dict]
+    ) -> Dict:
+        """Render both tsqueries and count their matches in a single round trip"""
+        plain_query = query.replace('_', ' ')
+        params = [cleaned_query, plain_query]
+        file_filter = None
+        if filter_dict and "file_id" in filter_dict:
+            file_filter = {"file_id": filter_dict["file_id"]}
+        conditions = self._build_filter_conditions(file_filter, params)
+
+        where_clause = ""
+        if conditions:
+            where_clause = "WHERE " + " AND ".join(conditions)
+
+        row = await conn.fetchrow(f"""
+            SELECT
+                text_to_or_tsquery($1)::text AS or_tsquery,
+                plainto_tsquery('spanish', $2)::text AS and_tsquery,
+                COUNT(*) FILTER (WHERE search_vector @@ text_to_or_tsquery($1)) AS or_matches,
+                COUNT(*) FILTER (WHERE search_vector @@ plainto_tsquery('spanish', $2)) AS and_matches
+            FROM langchain_pg_embedding
+            {where_clause}
+        """, *params)
+
+        return {
+            'event': 'bm25_diagnostics',
+            'query': query,
+            'cleaned_query': cleaned_query,
+            'filter': filter_dict,
+            'or_tsquery': row['or_tsquery'],
+            'and_tsquery': row['and_tsquery'],
+            'or_matches': row['or_matches'],
+            'and_matches': row['and_matches'],
+        }
+
     async def bm25_search(
         self,
         query: str,
         k: int = 5,
         filter_dict: Optional[Dict] = None,
-        use_or_operator: bool = True
+        use_or_operator: bool = True,
+        diagnostics: bool = False
     ) -> List[Tuple[Document, float]]:
         """
-        Perform BM25 search using PostgreSQL's full-text search
+        Perform BM25 search using PostgreSQL's full-text search.
+        With diagnostics=True the tsquery renderings and match counts are
+        written to the explain log (see should_run_diagnostics).
         """
         start_time = time.time()
 
@@ -175,72 +739,23 @@ class HybridSearchService:
             # Clean the query text
             cleaned_query = self.clean_query_text(query)
 
+            await self.ensure_tombstones()
             async with pool.acquire() as conn:
-                # DEBUG logging
-                self.logger.info(f"=== BM25 DEBUG ===")
-                self.logger.info(f"Original query: '{query}'")
-                self.logger.info(f"Cleaned query: '{cleaned_query}'")
-                self.logger.info(f"Filter dict: {filter_dict}")
-                self.logger.info(f"use_or_operator: {use_or_operator}")
-
-                # Only run debug queries if we have a simple single file_id filter
-                if filter_dict and 'file_id' in filter_dict and isinstance(filter_dict['file_id'], str):
-                    # Single file_id case - safe to run debug queries
-                    result1 = await conn.fetchval(
-                        "SELECT text_to_or_tsquery($1)::text",
-                        cleaned_query
+                diagnostics_report = None
+                if diagnostics:
+                    diagnostics_report = await self._bm25_diagnostics(
+                        conn, query, cleaned_query, filter_dict
                     )
-                    result2 = await conn.fetchval(
-                        "SELECT plainto_tsquery('spanish', $1)::text",
-                        query.replace('_', ' ')
-                    )
-
-                    self.logger.info(f"text_to_or_tsquery('{cleaned_query}'): {result1}")
-                    self.logger.info(f"plainto_tsquery('{query.replace('_', ' ')}'): {result2}")
-
-                    count1 = await conn.fetchval("""
-                        SELECT COUNT(*) FROM langchain_pg_embedding
-                        WHERE search_vector @@ text_to_or_tsquery($1)
-                        AND cmetadata->>'file_id' = $2
-                    """, cleaned_query, filter_dict['file_id'])
-
-                    count2 = await conn.fetchval("""
-                        SELECT COUNT(*) FROM langchain_pg_embedding
-                        WHERE search_vector @@ plainto_tsquery('spanish', $1)
-                        AND cmetadata->>'file_id' = $2
-                    """, query.replace('_', ' '), filter_dict['file_id'])
-
-                    self.logger.info(f"Matches con text_to_or_tsquery: {count1}")
-                    self.logger.info(f"Matches con plainto_tsquery: {count2}")
-                elif filter_dict and 'file_id' in filter_dict and isinstance(filter_dict['file_id'], dict):
-                    # Multiple file_ids case
-                    file_ids = filter_dict['file_id'].get('$in', [])
-                    self.logger.info(f"Multiple file_ids search: {len(file_ids)} files")
-
-                self.logger.info(f"=================")
 
                 # Build filter conditions
-                conditions = []
                 param_values = [cleaned_query, k]
-
-                if filter_dict:
-                    if "file_id" in filter_dict:
-                        if isinstance(filter_dict["file_id"], str):
-                            # Single file_id
-                            conditions.append("cmetadata->>'file_id' = $3")
-                            param_values.append(filter_dict["file_id"])
-                        elif isinstance(filter_dict["file_id"], dict) and "$in" in filter_dict["file_id"]:
-                            # Multiple file_ids
-                            file_ids = filter_dict["file_id"]["$in"]
-                            if file_ids:
-                                placeholders = []
-                                for i, fid in enumerate(file_ids):
-                                    param_idx = len(param_values) + 1
-                                    placeholders.append(f"${param_idx}")
-                                    param_values.append(fid)
-                                conditions.append(
-                                    f"cmetadata->>'file_id' IN ({','.join(placeholders)})"
-                                )
+                file_filter = None
+                if filter_dict and "file_id" in filter_dict:
+                    file_filter = {"file_id": filter_dict["file_id"]}
+                conditions = self._build_filter_conditions(file_filter, param_values)
+                tombstone_condition = self._tombstone_condition()
+                if tombstone_condition:
+                    conditions.append(tombstone_condition)
 
                 where_clause = ""
                 if conditions:
@@ -273,17 +788,7 @@ class HybridSearchService:
 
                 documents = []
                 for row in rows:
-                    metadata = row['cmetadata']
-                    if isinstance(metadata, str):
-                        try:
-                            metadata = json.loads(metadata)
-                        except json.JSONDecodeError:
-                            metadata = {}
-                    elif metadata is None:
-                        metadata = {}
-
-                    if not isinstance(metadata, dict):
-                        metadata = {}
+                    metadata = parse_metadata(row['cmetadata'])
 
                     # Ensure ID consistency
                     custom_id = row['custom_id']
@@ -307,6 +812,15 @@ class HybridSearchService:
                     f"OR: {use_or_operator}"
                 )
 
+                if diagnostics_report is not None:
+                    diagnostics_report.update({
+                        'use_or_operator': use_or_operator,
+                        'k': k,
+                        'found': len(documents),
+                        'elapsed': round(elapsed, 4),
+                    })
+                    explain_logger.info(json.dumps(diagnostics_report, ensure_ascii=False))
+
                 return documents
 
         except Exception as e:
@@ -314,6 +828,123 @@ class HybridSearchService:
             self.logger.error(f"Query: {query}, Filter: {filter_dict}")
             raise
 
+    async def hybrid_search(
+        self,
+        query: str,
+        embedding: List[float],
+        k: int = 5,
+        filter_dict: Optional[Dict] = None,
+        semantic_weight: float = 0.7,
+        fusion_k: int = 60,
+        candidates: Optional[int] = None,
+        collection_name: Optional[str] = None,
+        distance_operator: str = "<=>"
+    ) -> List[Tuple[Document, float]]:
+        """
+        Perform vector KNN, BM25 ranking and weighted RRF in a single statement.
+        Both legs keep `candidates` rows inside Postgres; only the fused top k are returned.
+        """
+        if not self.supports_filter(filter_dict):
+            raise ValueError(f"Filter cannot be pushed down to SQL: {filter_dict}")
+
+        start_time = time.time()
+        candidates = max(candidates or k, k)
+        pool = await self.get_pool()
+
+        params = [
+            self._encode_vector(embedding),
+            self.clean_query_text(query),
+            candidates,
+            float(semantic_weight),
+            fusion_k,
+            k,
+        ]
+        conditions = []
+        if collection_name:
+            params.append(collection_name)
+            conditions.append(
+                f"e.collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = ${len(params)})"
+            )
+        conditions.extend(self._build_filter_conditions(filter_dict, params, alias="e"))
+        await self.ensure_tombstones()
+        tombstone_condition = self._tombstone_condition("e")
+        if tombstone_condition:
+            conditions.append(tombstone_condition)
+
+        semantic_where = ""
+        if conditions:
+            semantic_where = "WHERE " + " AND ".join(conditions)
+        bm25_where = " AND ".join(["e.search_vector @@ q.query"] + conditions)
+
+        query_sql = f"""
+            WITH q AS (
+                SELECT text_to_or_tsquery($2) AS query
+            ),
+            semantic AS (
+                SELECT custom_id, document, cmetadata,
+                       ROW_NUMBER() OVER (ORDER BY distance) AS rank
+                FROM (
+                    SELECT e.custom_id, e.document, e.cmetadata,
+                           e.embedding {distance_operator} {self._vector_param(1)} AS distance
+                    FROM langchain_pg_embedding e
+                    {semantic_where}
+                    ORDER BY distance
+                    LIMIT $3
+                ) s
+            ),
+            bm25 AS (
+                SELECT custom_id, document, cmetadata, score,
+                       ROW_NUMBER() OVER (ORDER BY score DESC) AS rank
+                FROM (
+                    SELECT e.custom_id, e.document, e.cmetadata,
+                           ts_rank_cd(e.search_vector, q.query, 32) AS score
+                    FROM langchain_pg_embedding e, q
+                    WHERE {bm25_where}
+                    ORDER BY score DESC
+                    LIMIT $3
+                ) b
+            )
+            SELECT
+                COALESCE(s.custom_id, b.custom_id) AS custom_id,
+                COALESCE(s.document, b.document) AS document,
+                COALESCE(s.cmetadata, b.cmetadata) AS cmetadata,
+                COALESCE($4::float8 / ($5 + s.rank), 0)
+                    + COALESCE((1 - $4::float8) / ($5 + b.rank), 0) AS fusion_score,
+                s.rank AS semantic_rank,
+                b.rank AS bm25_rank,
+                b.score AS bm25_score
+            FROM semantic s
+            FULL OUTER JOIN bm25 b ON s.custom_id = b.custom_id
+            ORDER BY fusion_score DESC
+            LIMIT $6
+        """
+
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(query_sql, *params)
+
+        documents = []
+        for row in rows:
+            metadata = parse_metadata(row['cmetadata'])
+            metadata['custom_id'] = row['custom_id']
+            if row['bm25_score'] is not None:
+                metadata['_bm25_score'] = float(row['bm25_score'])
+
+            # Ranks are 0-based with -1 for "not found", matching reciprocal_rank_fusion
+            score = float(row['fusion_score'])
+            metadata['_fusion_score'] = score
+            metadata['_semantic_rank'] = row['semantic_rank'] - 1 if row['semantic_rank'] else -1
+            metadata['_bm25_rank'] = row['bm25_rank'] - 1 if row['bm25_rank'] else -1
+
+            documents.append((Document(page_content=row['document'], metadata=metadata), score))
+
+        self.metrics['fusion_operations'] += 1
+        self.logger.info(
+            f"SQL hybrid search completed in {time.time() - start_time:.3f}s | "
+            f"Query: {query[:50]}... | Found: {len(documents)} documents"
+        )
+
+        return documents
+
     def get_document_key(self, doc: Document) -> str:
         """
         Generate consistent key using file_id + chunk_index
@@ -409,15 +1040,377 @@ class HybridSearchService:
             self.logger.error(f"Error in reciprocal rank fusion: {e}")
             return semantic_results
 
+    def _register_file_id_index(self):
+        self.migrations.register(IndexMigration(
+            "idx_file_id",
+            "idx_file_id",
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_file_id
+            ON langchain_pg_embedding ((cmetadata->>'file_id'));
+            """,
+            timeout=self._maintenance_timeout()
+        ))
+
+    def ensure_ingest_indexes(self):
+        """Register indexes used by the ingest/delete paths; works with hybrid search disabled"""
+        if self._ingest_indexes_registered:
+            return
+        self._ingest_indexes_registered = True
+        self._register_file_id_index()
+        self.migrations.register(IndexMigration(
+            "idx_digest",
+            "idx_digest",
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_digest
+            ON langchain_pg_embedding ((cmetadata->>'digest'));
+            """,
+            timeout=self._maintenance_timeout()
+        ))
+        self.migrations.register(IndexMigration(
+            "idx_collection_custom_id",
+            "idx_collection_custom_id",
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_collection_custom_id
+            ON langchain_pg_embedding (collection_id, custom_id);
+            """,
+            timeout=self._maintenance_timeout()
+        ))
+        self.migrations.register(IndexMigration(
+            "idx_file_sha256",
+            "idx_file_sha256",
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_file_sha256
+            ON langchain_pg_embedding ((cmetadata->>'file_sha256'));
+            """,
+            timeout=self._maintenance_timeout()
+        ))
+        self.migrations.start()
+
+    def _decode_vector(self, value) -> List[float]:
+        """Turn a vector column value (numpy array or text literal) into a list"""
+        if isinstance(value, str):
+            return [float(x) for x in value.strip('[]').split(',') if x]
+        if hasattr(value, 'tolist'):
+            return value.tolist()
+        return list(value)
+
+    async def find_embeddings_by_digest(
+        self,
+        digests: List[str],
+        embedding_model: str
+    ) -> Dict[str, List[float]]:
+        """
+        Return stored embeddings keyed by chunk digest, for rows embedded with
+        `embedding_model`. Empty until idx_digest exists, to avoid table scans.
+        """
+        if not digests or not self.migrations.is_complete("idx_digest"):
+            return {}
+
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT DISTINCT ON (cmetadata->>'digest')
+                    cmetadata->>'digest' AS digest,
+                    embedding
+                FROM langchain_pg_embedding
+                WHERE cmetadata->>'digest' = ANY($1::text[])
+                AND cmetadata->>'embedding_model' = $2
+            """, list(set(digests)), embedding_model)
+
+        return {row['digest']: self._decode_vector(row['embedding']) for row in rows}
+
+    async def find_file_by_sha256(
+        self,
+        sha256: str,
+        embedding_model: str,
+        collection_name: str,
+        prefer_file_id: str = None
+    ) -> Optional[str]:
+        """
+        Return a file_id whose stored chunks came from a byte-identical upload
+        embedded with `embedding_model` (`prefer_file_id` wins if it matches).
+        None until idx_file_sha256 exists, to avoid table scans.
+        """
+        if not self.migrations.is_complete("idx_file_sha256"):
+            return None
+
+        await self.ensure_tombstones()
+        tombstone_condition = self._tombstone_condition()
+        tombstone_filter = f"AND {tombstone_condition}" if tombstone_condition else ""
+
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            return await conn.fetchval(f"""
+                SELECT cmetadata->>'file_id'
+                FROM langchain_pg_embedding
+                WHERE cmetadata->>'file_sha256' = $1
+                AND cmetadata->>'embedding_model' = $2
+                AND collection_id = (
+                    SELECT uuid FROM langchain_pg_collection WHERE name = $3
+                )
+                {tombstone_filter}
+                ORDER BY (cmetadata->>'file_id' = $4) DESC
+                LIMIT 1
+            """, sha256, embedding_model, collection_name, prefer_file_id or "")
+
+    async def copy_file_chunks(
+        self,
+        source_file_id: str,
+        file_id: str,
+        user_id: str,
+        collection_name: str,
+        source: str,
+        with_search_text: bool = False
+    ) -> int:
+        """
+        Copy every stored chunk of one file to another file_id in a single
+        INSERT ... SELECT (embeddings included). file_id, user_id and source
+        are rewritten so nothing of the other upload leaks. Returns the number of rows.
+        """
+        columns = "uuid, collection_id, embedding, document, cmetadata, custom_id"
+        if with_search_text:
+            columns += ", search_text"
+
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            result = await conn.execute(f"""
+                INSERT INTO langchain_pg_embedding ({columns})
+                SELECT
+                    gen_random_uuid(),
+                    e.collection_id,
+                    e.embedding,
+                    e.document,
+                    (e.cmetadata::jsonb || jsonb_build_object(
+                        'file_id', $2::text,
+                        'user_id', $3::text,
+                        'source', $5::text
+                    ))::json,
+                    -- custom_id is "<file_id>_<index>_<hash>_<ts>"; swap the prefix
+                    $2::text || substr(e.custom_id, length($1::text) + 1)
+                    {", e.search_text" if with_search_text else ""}
+                FROM langchain_pg_embedding e
+                WHERE e.cmetadata->>'file_id' = $1
+                AND e.collection_id = (
+                    SELECT uuid FROM langchain_pg_collection WHERE name = $4
+                )
+            """, source_file_id, file_id, user_id, collection_name, source)
+
+        copied = int(result.split()[-1])
+        self.logger.info(f"Copied {copied} chunks from file {source_file_id} to {file_id}")
+        return copied
+
+    async def delete_files(self, file_ids: List[str], collection_name: str) -> Dict[str, int]:
+        """
+        Delete every chunk of the given files in one statement (served by
+        idx_file_id) and return the number of rows removed per file_id.
+        """
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("""
+                WITH deleted AS (
+                    DELETE FROM langchain_pg_embedding
+                    WHERE cmetadata->>'file_id' = ANY($1::text[])
+                    AND collection_id = (
+                        SELECT uuid FROM langchain_pg_collection WHERE name = $2
+                    )
+                    RETURNING cmetadata->>'file_id' AS file_id
+                )
+                SELECT file_id, count(*) AS deleted
+                FROM deleted
+                GROUP BY file_id
+            """, list(file_ids), collection_name)
+
+        counts = {file_id: 0 for file_id in file_ids}
+        counts.update({row['file_id']: row['deleted'] for row in rows})
+        return counts
+
+    async def get_file_chunks(self, file_id: str, collection_name: str) -> List[Dict]:
+        """Return uuid, digest and position metadata of every stored chunk of a file"""
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT
+                    e.uuid,
+                    e.cmetadata->>'digest' AS digest,
+                    e.cmetadata->>'chunk_index' AS chunk_index,
+                    e.cmetadata->>'total_chunks' AS total_chunks
+                FROM langchain_pg_embedding e
+                WHERE e.cmetadata->>'file_id' = $1
+                AND e.collection_id = (
+                    SELECT uuid FROM langchain_pg_collection WHERE name = $2
+                )
+            """, file_id, collection_name)
+        return [dict(row) for row in rows]
+
+    async def get_file_documents(self, file_id: str, collection_name: str) -> List[Document]:
+        """Return every stored chunk of a file as Documents, in chunk order"""
+        await self.ensure_tombstones()
+        tombstone_condition = self._tombstone_condition("e")
+        tombstone_filter = f"AND {tombstone_condition}" if tombstone_condition else ""
+
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(f"""
+                SELECT e.document, e.cmetadata
+                FROM langchain_pg_embedding e
+                WHERE e.cmetadata->>'file_id' = $1
+                AND e.collection_id = (
+                    SELECT uuid FROM langchain_pg_collection WHERE name = $2
+                )
+                {tombstone_filter}
+                ORDER BY (e.cmetadata->>'chunk_index')::int NULLS LAST, e.custom_id
+            """, file_id, collection_name)
+        return [
+            Document(page_content=row['document'], metadata=parse_metadata(row['cmetadata']))
+            for row in rows
+        ]
+
+    async def _ids_query(self, keyset: bool) -> str:
+        await self.ensure_tombstones()
+        conditions = [
+            "collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = $1)",
+            "custom_id IS NOT NULL",
+        ]
+        if keyset:
+            conditions.append("custom_id > $2")
+        tombstone_condition = self._tombstone_condition()
+        if tombstone_condition:
+            conditions.append(tombstone_condition)
+        # DISTINCT over an ordered index scan of (collection_id, custom_id)
+        return f"""
+            SELECT DISTINCT custom_id
+            FROM langchain_pg_embedding
+            WHERE {" AND ".join(conditions)}
+            ORDER BY custom_id
+            {"LIMIT $3" if keyset else ""}
+        """
+
+    async def get_ids_page(
+        self,
+        collection_name: str,
+        after: str = "",
+        limit: int = 1000
+    ) -> List[str]:
+        """Return up to `limit` distinct ids sorted after `after` (keyset pagination)"""
+        query_sql = await self._ids_query(keyset=True)
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(query_sql, collection_name, after or "", limit)
+        return [row['custom_id'] for row in rows]
+
+    async def iter_ids(self, collection_name: str, batch_size: int = 1000):
+        """
+        Yield lists of distinct ids from a server-side cursor, so memory stays
+        bounded by `batch_size`. The connection is held until the generator closes.
+        """
+        query_sql = await self._ids_query(keyset=False)
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(query_sql, collection_name)
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    if not rows:
+                        return
+                    yield [row['custom_id'] for row in rows]
+
+    async def iter_documents_by_ids(
+        self,
+        ids: List[str],
+        collection_name: str,
+        batch_size: int = 500
+    ):
+        """
+        Look up documents by custom_id in one cursor query that also reports
+        missing ids. The first item yielded is the list of missing ids; when it
+        is empty, lists of document dicts follow. The generator owns its
+        connection and releases it when it finishes or is closed.
+        """
+        await self.ensure_tombstones()
+        tombstone_condition = self._tombstone_condition("e")
+        tombstone_filter = f"AND {tombstone_condition}" if tombstone_condition else ""
+
+        # Missing ids sort first, so the first batch tells whether to fail
+        query_sql = f"""
+            SELECT r.id, e.uuid, e.document, e.cmetadata
+            FROM unnest($1::text[]) WITH ORDINALITY AS r(id, ord)
+            LEFT JOIN langchain_pg_embedding e
+                ON e.custom_id = r.id
+                AND e.collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = $2)
+                {tombstone_filter}
+            ORDER BY e.uuid IS NULL DESC, r.ord
+        """
+
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(query_sql, list(dict.fromkeys(ids)), collection_name)
+                rows = await cursor.fetch(batch_size)
+                missing = []
+                while rows and rows[-1]['uuid'] is None:
+                    missing.extend(row['id'] for row in rows)
+                    rows = await cursor.fetch(batch_size)
+                missing.extend(row['id'] for row in rows if row['uuid'] is None)
+
+                yield missing
+                if missing:
+                    return
+
+                while rows:
+                    yield [
+                        {"page_content": row['document'], "metadata": parse_metadata(row['cmetadata'])}
+                        for row in rows
+                    ]
+                    rows = await cursor.fetch(batch_size)
+
+    def _get_writer_slots(self) -> asyncio.Semaphore:
+        if self._writer_slots is None:
+            from app.config import INGEST_MAX_WRITERS, HYBRID_POOL_MAX_SIZE
+            writers = INGEST_MAX_WRITERS or HYBRID_POOL_MAX_SIZE // 2
+            self._writer_slots = asyncio.Semaphore(max(1, writers))
+        return self._writer_slots
+
+    @asynccontextmanager
+    async def chunk_writer(self, collection_name: str, with_search_text: bool = False):
+        """
+        Yield a ChunkWriter bound to one connection and transaction.
+        Everything written through it commits (or rolls back) together.
+
+        The connection stays checked out for the whole ingest, embedding
+        included, so at most INGEST_MAX_WRITERS writers run at once and the
+        rest of the pool stays available to searches.
+        """
+        pool = await self.get_pool()
+
+        columns = "uuid, collection_id, embedding, document, cmetadata, custom_id"
+        values = f"$1, $2, {self._vector_param(3)}, $4, $5, $6"
+        if with_search_text:
+            # search_text mirrors the document, so reuse its parameter
+            columns += ", search_text"
+            values += ", $4"
+        insert_sql = f"INSERT INTO langchain_pg_embedding ({columns}) VALUES ({values})"
+
+        async with self._get_writer_slots(), pool.acquire() as conn:
+            async with conn.transaction():
+                collection_id = await conn.fetchval(
+                    "SELECT uuid FROM langchain_pg_collection WHERE name = $1",
+                    collection_name
+                )
+                if collection_id is None:
+                    raise ValueError(f"Collection not found: {collection_name}")
+
+                yield ChunkWriter(conn, insert_sql, collection_id, self._encode_vector)
+
     async def update_search_text_batch(
         self,
         documents: List[Document],
         file_id: str,
         chunk_ids: List[str],
         max_retries: int = 3
-    ) -> bool:
+    ) -> List[bool]:
         """
-        Update search_text for a batch of documents with retry logic
+        Update search_text for a batch of documents with retry logic.
+        Runs as one set-based UPDATE; returns per-chunk success aligned with chunk_ids.
         """
         retry_count = 0
         backoff_base = 0.5
@@ -426,40 +1419,41 @@ class HybridSearchService:
             try:
                 pool = await self.get_pool()
                 async with pool.acquire() as conn:
-                    async with conn.transaction():
-                        updated_count = 0
-                        for i, (doc, chunk_id) in enumerate(zip(documents, chunk_ids)):
-                            # Cast cmetadata to jsonb for proper || operator usage
-                            result = await conn.fetchval("""
-                                UPDATE langchain_pg_embedding
-                                SET search_text = $1,
-                                    cmetadata = (cmetadata::jsonb ||
-                                        jsonb_build_object(
-                                            'chunk_index', $4::text,
-                                            'total_chunks', $5::text
-                                        ))::json
-                                WHERE custom_id = $2
-                                AND cmetadata->>'file_id' = $3
-                                RETURNING custom_id
-                            """,
-                            doc.page_content,
-                            chunk_id,
-                            file_id,
-                            str(i),
-                            str(len(documents))
-                            )
-
-                            if result:
-                                updated_count += 1
-                            else:
-                                self.logger.warning(
-                                    f"Document not found: chunk_id={chunk_id}, file_id={file_id}"
-                                )
-
-                        self.logger.info(
-                            f"Updated search_text for {updated_count}/{len(documents)} documents"
-                        )
-                        return updated_count > 0  # Return True if at least one was updated
+                    # Cast cmetadata to jsonb for proper || operator usage
+                    rows = await conn.fetch("""
+                        UPDATE langchain_pg_embedding AS e
+                        SET search_text = u.search_text,
+                            cmetadata = (e.cmetadata::jsonb ||
+                                jsonb_build_object(
+                                    'chunk_index', u.chunk_index,
+                                    'total_chunks', $4::text
+                                ))::json
+                        FROM unnest($1::text[], $2::text[], $3::text[])
+                            AS u(custom_id, search_text, chunk_index)
+                        WHERE e.custom_id = u.custom_id
+                        AND e.cmetadata->>'file_id' = $5
+                        RETURNING e.custom_id
+                    """,
+                    list(chunk_ids),
+                    [doc.page_content for doc in documents],
+                    [str(i) for i in range(len(documents))],
+                    str(len(documents)),
+                    file_id
+                    )
+
+                updated_ids = {row['custom_id'] for row in rows}
+                results = [chunk_id in updated_ids for chunk_id in chunk_ids]
+
+                missing = len(results) - len(updated_ids)
+                if missing:
+                    self.logger.warning(
+                        f"{missing} document(s) not found for file_id={file_id}"
+                    )
+
+                self.logger.info(
+                    f"Updated search_text for {len(updated_ids)}/{len(documents)} documents"
+                )
+                return results
 
             except Exception as e:
                 retry_count += 1
@@ -467,7 +1461,7 @@ class HybridSearchService:
                     self.logger.error(
                         f"Failed to update search_text after {max_retries} attempts: {e}"
                     )
-                    return False
+                    return [False] * len(chunk_ids)
 
                 wait_time = backoff_base * (2 ** retry_count)
                 self.logger.warning(
@@ -476,10 +1470,14 @@ class HybridSearchService:
                 )
                 await asyncio.sleep(wait_time)
 
-        return False
+        return [False] * len(chunk_ids)
 
     async def cleanup(self):
         """Cleanup resources"""
+        self.migrations.stop()
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+            self._purge_task = None
         if self._pool:
             await self._pool.close()
             self._pool = None
@@ -496,7 +1494,16 @@ class HybridSearchService:
         return {
             'bm25_searches': self.metrics['bm25_searches'],
             'avg_bm25_time': avg_bm25_time,
-            'fusion_operations': self.metrics['fusion_operations']
+            'fusion_operations': self.metrics['fusion_operations'],
+            'tombstones': {
+                'enabled': self._tombstones_ready,
+                'purged_files': self.metrics['tombstones_purged'],
+                'purged_rows': self.metrics['tombstone_rows_purged'],
+                'vacuums': self.metrics['vacuums'],
+                'reindexes': self.metrics['reindexes'],
+            },
+            'status': self.status,
+            'migrations': self.migrations.report()
         }
 
 # Global instance
@@ -0,0 +1,228 @@
+# app/services/ingest_jobs.py
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueueFull(Exception):
+    """Raised when the ingest backlog is at its configured depth"""
+
+
+class IngestJobQueue:
+    """
+    Bounded background queue for ingest jobs.
+
+    Jobs run on `workers` local tasks; their state is kept in the
+    rag_ingest_jobs table so any API worker can answer status requests.
+    Each queue heartbeats its own jobs, and jobs whose owner stopped
+    heartbeating (process restarted or died) are marked failed.
+    """
+
+    def __init__(
+        self,
+        pool_getter,
+        workers: int = 2,
+        max_depth: int = 100,
+        heartbeat_interval: float = 30.0,
+        stale_after: float = 600.0
+    ):
+        self._pool_getter = pool_getter
+        self.workers = max(1, workers)
+        self.max_depth = max(1, max_depth)
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._running = 0
+        # Submissions that passed the depth check but are not queued yet
+        self._reserved = 0
+        self._table_ready = False
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def depth(self) -> int:
+        """Jobs queued, running or being submitted in this process"""
+        return (self._queue.qsize() if self._queue else 0) + self._running + self._reserved
+
+    async def _ensure_table(self, conn):
+        if self._table_ready:
+            return
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS rag_ingest_jobs (
+                id UUID PRIMARY KEY,
+                file_id TEXT NOT NULL,
+                filename TEXT,
+                user_id TEXT,
+                status TEXT NOT NULL,
+                result JSONB,
+                error TEXT,
+                owner TEXT,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                started_at TIMESTAMPTZ,
+                finished_at TIMESTAMPTZ,
+                heartbeat_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+        """)
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_rag_ingest_jobs_active
+            ON rag_ingest_jobs (status) WHERE status IN ('queued', 'running');
+        """)
+        self._table_ready = True
+
+    async def _fail_stale_jobs(self, conn):
+        failed = await conn.fetchval("""
+            WITH stale AS (
+                UPDATE rag_ingest_jobs
+                SET status = 'failed',
+                    error = 'Interrupted: the worker running this job stopped',
+                    finished_at = now()
+                WHERE status IN ('queued', 'running')
+                AND heartbeat_at < now() - make_interval(secs => $1::float8)
+                RETURNING 1
+            )
+            SELECT count(*) FROM stale
+        """, float(self.stale_after))
+        if failed:
+            logger.warning(f"Marked {failed} interrupted ingest jobs as failed")
+
+    def _start(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._heartbeat()))
+
+    async def submit(
+        self,
+        run: Callable[[], Awaitable[Dict]],
+        file_id: str,
+        filename: str = None,
+        user_id: str = None
+    ) -> str:
+        """Record and enqueue a job; raises IngestQueueFull when the backlog is too deep"""
+        if self.depth >= self.max_depth:
+            self.rejected += 1
+            raise IngestQueueFull(f"Ingest queue is full ({self.depth}/{self.max_depth} jobs)")
+
+        # Hold the slot across the awaits below so concurrent submits see it
+        self._reserved += 1
+        try:
+            job_id = str(uuid.uuid4())
+            pool = await self._pool_getter()
+            async with pool.acquire() as conn:
+                if not self._table_ready:
+                    await self._ensure_table(conn)
+                    await self._fail_stale_jobs(conn)
+                await conn.execute("""
+                    INSERT INTO rag_ingest_jobs (id, file_id, filename, user_id, status, owner)
+                    VALUES ($1, $2, $3, $4, 'queued', $5)
+                """, uuid.UUID(job_id), file_id, filename, user_id, self.owner)
+
+            self._start()
+            self._queue.put_nowait((job_id, run))
+        finally:
+            self._reserved -= 1
+        self.submitted += 1
+        return job_id
+
+    async def _update(self, job_id: str, query: str, *args):
+        try:
+            pool = await self._pool_getter()
+            async with pool.acquire() as conn:
+                await conn.execute(query, uuid.UUID(job_id), *args)
+        except Exception as e:
+            logger.error(f"Failed to update ingest job {job_id}: {e}")
+
+    async def _worker(self):
+        while True:
+            job_id, run = await self._queue.get()
+            self._running += 1
+            try:
+                await self._update(job_id, """
+                    UPDATE rag_ingest_jobs
+                    SET status = 'running', started_at = now(), heartbeat_at = now()
+                    WHERE id = $1
+                """)
+                result = await run()
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Ingest job {job_id} failed: {e}")
+                await self._update(job_id, """
+                    UPDATE rag_ingest_jobs
+                    SET status = 'failed', error = $2, finished_at = now()
+                    WHERE id = $1
+                """, str(e))
+            else:
+                self.completed += 1
+                await self._update(job_id, """
+                    UPDATE rag_ingest_jobs
+                    SET status = 'done', result = $2::jsonb, finished_at = now()
+                    WHERE id = $1
+                """, json.dumps(result, default=str))
+            finally:
+                self._running -= 1
+                self._queue.task_done()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                pool = await self._pool_getter()
+                async with pool.acquire() as conn:
+                    if self.depth:
+                        await conn.execute("""
+                            UPDATE rag_ingest_jobs SET heartbeat_at = now()
+                            WHERE owner = $1 AND status IN ('queued', 'running')
+                        """, self.owner)
+                    await self._fail_stale_jobs(conn)
+            except Exception as e:
+                logger.warning(f"Ingest job heartbeat failed: {e}")
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        """Return a job's state, or None if unknown"""
+        try:
+            key = uuid.UUID(job_id)
+        except ValueError:
+            return None
+
+        pool = await self._pool_getter()
+        async with pool.acquire() as conn:
+            await self._ensure_table(conn)
+            row = await conn.fetchrow("""
+                SELECT id, file_id, filename, status, result, error,
+                       created_at, started_at, finished_at
+                FROM rag_ingest_jobs WHERE id = $1
+            """, key)
+
+        if row is None:
+            return None
+        job = dict(row)
+        job["id"] = str(job["id"])
+        if isinstance(job["result"], str):
+            job["result"] = json.loads(job["result"])
+        return job
+
+    def stats(self) -> Dict:
+        """Return queue counters for this process"""
+        return {
+            'workers': self.workers,
+            'max_depth': self.max_depth,
+            'queued': self._queue.qsize() if self._queue else 0,
+            'running': self._running,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,313 @@
+# app/services/ingest_pipeline.py
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (text, metadata, custom_id)
+Chunk = Tuple[str, Dict, str]
+
+_DONE = object()
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Recognize HTTP 429 errors from the provider SDKs (openai, httpx, requests, botocore)"""
+    for source in (error, getattr(error, 'response', None)):
+        if source is None:
+            continue
+        if getattr(source, 'status_code', None) == 429 or getattr(source, 'status', None) == 429:
+            return True
+    message = str(error).lower()
+    return '429' in message or 'rate limit' in message or 'throttl' in message
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Read a Retry-After header (seconds) from the error's response, if any"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get('retry-after') or headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveEmbedder:
+    """
+    Run embedding calls with a concurrency limit that adapts to rate limits.
+
+    The limit starts at `max_concurrency`. A 429 halves it and the batch is
+    retried after Retry-After (or exponential backoff with jitter). Every
+    `recover_after` successful calls raise it by one, back up to the maximum.
+    One instance is shared by all uploads so the limit applies per process.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[..., Awaitable[List[List[float]]]],
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        recover_after: int = 10
+    ):
+        self._embed_batch = embed_batch
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.recover_after = recover_after
+
+        self.limit = self.max_concurrency
+        self._active = 0
+        self._successes = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+        self.calls = 0
+        self.rate_limited = 0
+        self.retries = 0
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so it binds to the running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def _acquire(self):
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+
+    async def _release(self):
+        condition = self._get_condition()
+        async with condition:
+            self._active -= 1
+            condition.notify_all()
+
+    async def embed(self, texts: List[str], *args) -> List[List[float]]:
+        """Embed one batch, waiting for a slot and retrying on rate limits"""
+        attempt = 0
+        while True:
+            await self._acquire()
+            try:
+                self.calls += 1
+                vectors = await self._embed_batch(texts, *args)
+            except Exception as e:
+                if not _is_rate_limited(e) or attempt >= self.max_retries:
+                    raise
+                error = e
+            else:
+                self._successes += 1
+                if self._successes >= self.recover_after and self.limit < self.max_concurrency:
+                    self._successes = 0
+                    self.limit += 1
+                return vectors
+            finally:
+                await self._release()
+
+            # Rate limited: shrink the window for everyone, then back off
+            self.rate_limited += 1
+            self.retries += 1
+            self._successes = 0
+            self.limit = max(1, self.limit // 2)
+
+            delay = _retry_after(error)
+            if delay is None:
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                delay *= random.uniform(0.5, 1.0)
+            logger.warning(
+                f"Embedding provider rate limited, retrying in {delay:.1f}s "
+                f"(attempt {attempt + 1}/{self.max_retries}, concurrency {self.limit})"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict:
+        """Return concurrency and rate limit counters"""
+        return {
+            'max_concurrency': self.max_concurrency,
+            'current_limit': self.limit,
+            'in_flight': self._active,
+            'calls': self.calls,
+            'rate_limited': self.rate_limited,
+            'retries': self.retries,
+        }
+
+
+class DigestReuseEmbedder:
+    """
+    Embed a batch, reusing vectors already stored for identical content.
+
+    `lookup(digests)` returns {digest: vector} for stored chunks embedded
+    with the current model; only the remaining unique texts are sent to
+    `embed_batch`. A failed lookup falls back to embedding everything.
+    """
+
+    def __init__(
+        self,
+        lookup: Callable[[List[str]], Awaitable[Dict[str, List[float]]]],
+        embed_batch: Callable[..., Awaitable[List[List[float]]]],
+        digest: Callable[[str], str]
+    ):
+        self._lookup = lookup
+        self._embed_batch = embed_batch
+        self._digest = digest
+
+        self.chunks = 0
+        self.reused = 0
+        self.embedded = 0
+        self.lookup_errors = 0
+
+    async def embed(self, texts: List[str], *args) -> List[List[float]]:
+        """Embed one batch; returns vectors aligned with `texts`"""
+        digests = [self._digest(text) for text in texts]
+        try:
+            known = await self._lookup(digests)
+        except Exception as e:
+            self.lookup_errors += 1
+            logger.warning(f"Embedding reuse lookup failed, embedding the whole batch: {e}")
+            known = {}
+
+        # Unique digests still missing (duplicate chunks are embedded once)
+        missing: Dict[str, str] = {}
+        for digest, text in zip(digests, texts):
+            if digest not in known and digest not in missing:
+                missing[digest] = text
+
+        if missing:
+            vectors = await self._embed_batch(list(missing.values()), *args)
+            known = {**known, **dict(zip(missing.keys(), vectors))}
+
+        self.chunks += len(texts)
+        self.embedded += len(missing)
+        self.reused += len(texts) - len(missing)
+        return [known[digest] for digest in digests]
+
+    def stats(self) -> Dict:
+        """Return reuse counters"""
+        return {
+            'chunks': self.chunks,
+            'reused': self.reused,
+            'embedded': self.embedded,
+            'reuse_rate': self.reused / self.chunks if self.chunks else 0,
+            'lookup_errors': self.lookup_errors,
+        }
+
+
+class IngestPipeline:
+    """
+    Stream chunks through embed and write stages connected by bounded queues.
+
+    Chunks are grouped into batches of `batch_size` and at most `queue_depth`
+    batches wait between two stages, so only a few batches of embeddings are
+    held in memory at once and embedding batch N+1 runs while batch N is
+    being written. Up to `embed_concurrency` batches are embedded at the
+    same time; batches may be written in any order.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+        write_batch: Callable[[List[str], List[List[float]], List[Dict], List[str]], Awaitable[int]],
+        batch_size: int = 200,
+        queue_depth: int = 2,
+        embed_concurrency: int = 1
+    ):
+        self._embed_batch = embed_batch
+        self._write_batch = write_batch
+        self.batch_size = max(1, batch_size)
+        self.queue_depth = max(1, queue_depth)
+        self.embed_concurrency = max(1, embed_concurrency)
+
+        self.batches = 0
+        self.chunks = 0
+        self.embed_seconds = 0.0
+        self.write_seconds = 0.0
+
+    async def _produce(self, chunks: Iterable[Chunk], queue: asyncio.Queue):
+        batch: List[Chunk] = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= self.batch_size:
+                await queue.put(batch)
+                batch = []
+        if batch:
+            await queue.put(batch)
+        await queue.put(_DONE)
+
+    async def _embed(self, source: asyncio.Queue, sink: asyncio.Queue):
+        while True:
+            batch = await source.get()
+            if batch is _DONE:
+                # Leave the marker for the other embed workers
+                await source.put(_DONE)
+                return
+
+            started = time.perf_counter()
+            embeddings = await self._embed_batch([text for text, _, _ in batch])
+            self.embed_seconds += time.perf_counter() - started
+
+            if len(embeddings) != len(batch):
+                raise ValueError(
+                    f"Embedding provider returned {len(embeddings)} vectors for {len(batch)} chunks"
+                )
+            await sink.put((batch, embeddings))
+
+    async def _embed_stage(self, source: asyncio.Queue, sink: asyncio.Queue):
+        await asyncio.gather(*(
+            self._embed(source, sink) for _ in range(self.embed_concurrency)
+        ))
+        await sink.put(_DONE)
+
+    async def _write(self, source: asyncio.Queue):
+        while True:
+            item = await source.get()
+            if item is _DONE:
+                return
+
+            batch, embeddings = item
+            started = time.perf_counter()
+            await self._write_batch(
+                [text for text, _, _ in batch],
+                embeddings,
+                [metadata for _, metadata, _ in batch],
+                [custom_id for _, _, custom_id in batch],
+            )
+            self.write_seconds += time.perf_counter() - started
+            self.batches += 1
+            self.chunks += len(batch)
+
+    async def run(self, chunks: Iterable[Chunk]) -> int:
+        """Run all stages to completion; the first failure cancels the rest and is raised"""
+        to_embed: asyncio.Queue = asyncio.Queue(maxsize=self.queue_depth)
+        to_write: asyncio.Queue = asyncio.Queue(
+            maxsize=max(self.queue_depth, self.embed_concurrency)
+        )
+
+        tasks = [
+            asyncio.ensure_future(self._produce(chunks, to_embed)),
+            asyncio.ensure_future(self._embed_stage(to_embed, to_write)),
+            asyncio.ensure_future(self._write(to_write)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return self.chunks
+
+    def stats(self) -> Dict:
+        """Return stage timings for the last run"""
+        return {
+            'chunks': self.chunks,
+            'batches': self.batches,
+            'embed_seconds': round(self.embed_seconds, 3),
+            'write_seconds': round(self.write_seconds, 3),
+        }
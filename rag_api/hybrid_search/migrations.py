@@ -0,0 +1,239 @@
+# app/services/migrations.py
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Migration:
+    """A named, idempotent schema change executed by MigrationRunner"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    async def run(self, conn, state: Dict, save: Callable) -> None:
+        raise NotImplementedError
+
+
+class IndexMigration(Migration):
+    """
+    Build an index with CREATE INDEX CONCURRENTLY so writes are not blocked.
+    An invalid index left by an interrupted build is dropped and rebuilt.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        index_name: str,
+        create_sql: str,
+        timeout: Optional[float] = None
+    ):
+        super().__init__(name)
+        self.index_name = index_name
+        self.create_sql = create_sql
+        # Index builds on large tables outlast the pool's command_timeout
+        self.timeout = timeout
+
+    async def run(self, conn, state: Dict, save: Callable) -> None:
+        valid = await conn.fetchval("""
+            SELECT i.indisvalid
+            FROM pg_class c
+            JOIN pg_index i ON i.indexrelid = c.oid
+            WHERE c.relname = $1
+        """, self.index_name)
+        if valid:
+            return
+        if valid is False:
+            logger.warning(f"Dropping invalid index {self.index_name} before rebuilding it")
+            await conn.execute(
+                f"DROP INDEX CONCURRENTLY IF EXISTS {self.index_name}", timeout=self.timeout
+            )
+        await conn.execute(self.create_sql, timeout=self.timeout)
+
+
+class BackfillMigration(Migration):
+    """
+    Update rows in bounded keyset batches.
+
+    `batch_sql` takes ($1 = last key, $2 = batch size) and must return one row
+    with `last_key` (text), `scanned` and `updated` counts. The last key is
+    persisted after every batch, so an interrupted backfill resumes where it
+    stopped.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_sql: str,
+        initial_key: str,
+        batch_size: int = 5000,
+        pause: float = 0.05
+    ):
+        super().__init__(name)
+        self.batch_sql = batch_sql
+        self.initial_key = initial_key
+        self.batch_size = batch_size
+        self.pause = pause
+
+    async def run(self, conn, state: Dict, save: Callable) -> None:
+        last_key = state.get('last_key') or self.initial_key
+        while True:
+            row = await conn.fetchrow(self.batch_sql, last_key, self.batch_size)
+            if not row or not row['scanned']:
+                break
+
+            last_key = row['last_key']
+            state['last_key'] = last_key
+            state['rows_scanned'] = state.get('rows_scanned', 0) + row['scanned']
+            state['rows_done'] = state.get('rows_done', 0) + row['updated']
+            await save(state)
+
+            # Leave room for foreground traffic between batches
+            await asyncio.sleep(self.pause)
+
+
+class MigrationRunner:
+    """
+    Run registered migrations in the background, one at a time.
+
+    Progress is stored in the rag_schema_migrations table and each migration
+    holds a Postgres advisory lock while it runs, so only one worker does the
+    work and the others report its progress.
+    """
+
+    def __init__(self, pool_getter, poll_interval: float = 5.0):
+        self._pool_getter = pool_getter
+        self.poll_interval = poll_interval
+        self._migrations: List[Migration] = []
+        self._state: Dict[str, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, migration: Migration):
+        """Add a migration; registering the same name twice is a no-op"""
+        if migration.name in self._state:
+            return
+        self._migrations.append(migration)
+        self._state[migration.name] = {'status': 'pending'}
+
+    def start(self):
+        """Start (or restart) the background run if there is pending work"""
+        if self._task is not None and not self._task.done():
+            return
+        if all(s['status'] == 'done' for s in self._state.values()):
+            return
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        """Cancel the background run; progress is kept for the next start"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def is_complete(self, name: str) -> bool:
+        return self._state.get(name, {}).get('status') == 'done'
+
+    @property
+    def status(self) -> str:
+        statuses = [s['status'] for s in self._state.values()]
+        if all(s == 'done' for s in statuses):
+            return 'ready'
+        if 'failed' in statuses and not (self._task and not self._task.done()):
+            return 'failed'
+        return 'initializing'
+
+    def report(self) -> Dict:
+        """Return per-migration progress"""
+        return {name: dict(state) for name, state in self._state.items()}
+
+    async def _ensure_table(self, conn):
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS rag_schema_migrations (
+                name TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                state JSONB NOT NULL DEFAULT '{}'::jsonb,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+        """)
+
+    async def _load(self, conn, name: str) -> Dict:
+        row = await conn.fetchrow(
+            "SELECT status, state FROM rag_schema_migrations WHERE name = $1", name
+        )
+        if row is None:
+            return {'status': 'pending'}
+        state = json.loads(row['state']) if isinstance(row['state'], str) else dict(row['state'])
+        state['status'] = row['status']
+        return state
+
+    async def _save(self, conn, name: str, state: Dict):
+        self._state[name] = dict(state)
+        payload = {k: v for k, v in state.items() if k != 'status'}
+        await conn.execute("""
+            INSERT INTO rag_schema_migrations (name, status, state, updated_at)
+            VALUES ($1, $2, $3::jsonb, now())
+            ON CONFLICT (name)
+            DO UPDATE SET status = EXCLUDED.status, state = EXCLUDED.state, updated_at = now()
+        """, name, state['status'], json.dumps(payload))
+
+    async def _run(self):
+        # Migrations registered while a pass runs (start() is then a no-op)
+        # are picked up by the next pass; the run ends when a pass finds none
+        attempted = set()
+        try:
+            while True:
+                pending = [m for m in self._migrations if m.name not in attempted]
+                if not pending:
+                    return
+                pool = await self._pool_getter()
+                async with pool.acquire() as conn:
+                    await self._ensure_table(conn)
+                    for migration in pending:
+                        attempted.add(migration.name)
+                        await self._run_one(conn, migration)
+        except Exception as e:
+            logger.error(f"Schema migrations stopped: {e}")
+
+    async def _run_one(self, conn, migration: Migration):
+        name = migration.name
+        lock_key = f"rag_migration:{name}"
+
+        while True:
+            state = await self._load(conn, name)
+            self._state[name] = dict(state)
+            if state['status'] == 'done':
+                return
+            if await conn.fetchval("SELECT pg_try_advisory_lock(hashtext($1))", lock_key):
+                break
+            # Another worker is running it; report its progress until it finishes
+            await asyncio.sleep(self.poll_interval)
+
+        async def save(progress: Dict):
+            await self._save(conn, name, progress)
+
+        try:
+            state = await self._load(conn, name)
+            if state['status'] == 'done':
+                self._state[name] = state
+                return
+
+            state['status'] = 'running'
+            state.pop('error', None)
+            await save(state)
+            logger.info(f"Running schema migration {name}")
+
+            await migration.run(conn, state, save)
+
+            state['status'] = 'done'
+            await save(state)
+            logger.info(f"Schema migration {name} completed")
+        except Exception as e:
+            state['status'] = 'failed'
+            state['error'] = str(e)
+            logger.error(f"Schema migration {name} failed: {e}")
+            try:
+                await save(state)
+            except Exception:
+                pass
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock(hashtext($1))", lock_key)
@@ -32,6 +32,12 @@ class StoreDocument(BaseModel):
     filename: str
     file_content_type: str
     file_id: str
+    incremental: bool = False
+    async_mode: bool = False
+
+
+class StoreDocumentBatch(BaseModel):
+    documents: List[StoreDocument]
 
 
 class QueryRequestBody(BaseModel):
@@ -0,0 +1,6 @@
+# The modules here are copied into app/services/ of the RAG API image;
+# the ones under test only need the standard library, so import them by name.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,93 @@
+import asyncio
+
+import embedding_cache
+from embedding_cache import QueryEmbeddingBatcher, QueryEmbeddingCache
+
+
+def test_queries_are_normalized():
+    cache = QueryEmbeddingCache()
+    cache.set("  Hello   World ", [1.0, 2.0])
+    assert cache.get("hello world") == [1.0, 2.0]
+
+
+def test_evicts_by_entries_and_bytes():
+    cache = QueryEmbeddingCache(max_size=2)
+    cache.set("a", [1.0])
+    cache.set("b", [2.0])
+    cache.get("a")
+    cache.set("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+
+    # float32: 4 bytes per dimension
+    cache = QueryEmbeddingCache(max_bytes=16)
+    cache.set("a", [0.0, 0.0])
+    cache.set("b", [0.0, 0.0])
+    cache.set("c", [0.0, 0.0])
+    assert cache.get("a") is None
+    assert cache.stats()['bytes'] == 16
+
+    cache.set("too big", [0.0] * 5)
+    assert cache.get("too big") is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(embedding_cache.time, "monotonic", lambda: now[0])
+    cache = QueryEmbeddingCache(ttl=10)
+    cache.set("a", [1.0])
+
+    now[0] = 11
+    assert cache.get("a") is None
+    assert cache.stats()['expirations'] == 1
+    assert cache.stats()['bytes'] == 0
+
+
+def test_batcher_coalesces_concurrent_queries():
+    calls = []
+
+    async def embed_batch(texts):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    batcher = QueryEmbeddingBatcher(embed_batch, window=0.01)
+
+    async def run():
+        return await asyncio.gather(*(batcher.embed(t) for t in ["a", "bb", "ccc"]))
+
+    assert asyncio.run(run()) == [[1.0], [2.0], [3.0]]
+    assert calls == [["a", "bb", "ccc"]]
+
+
+def test_batcher_flushes_at_max_batch_size():
+    calls = []
+
+    async def embed_batch(texts):
+        calls.append(len(texts))
+        return [[0.0] for _ in texts]
+
+    batcher = QueryEmbeddingBatcher(embed_batch, window=10, max_batch_size=2)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.embed(str(i)) for i in range(4))), timeout=5
+        )
+
+    asyncio.run(run())
+    assert calls == [2, 2]
+
+
+def test_batcher_fails_every_caller_on_count_mismatch():
+    async def embed_batch(texts):
+        return [[0.0]] * (len(texts) - 1)
+
+    batcher = QueryEmbeddingBatcher(embed_batch, window=0.01)
+
+    async def run():
+        return await asyncio.gather(
+            *(batcher.embed(t) for t in ["a", "b", "c"]), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert "2 vectors for 3 queries" in str(results[0])
@@ -0,0 +1,82 @@
+import file_cache
+from file_cache import FileScopedCache
+
+
+def test_evicts_least_recently_used():
+    cache = FileScopedCache(max_size=2)
+    cache.set("a", 1, ["f1"])
+    cache.set("b", 2, ["f2"])
+    assert cache.get("a") == 1
+    cache.set("c", 3, ["f3"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(file_cache.time, "monotonic", lambda: now[0])
+    cache = FileScopedCache(ttl=10)
+    cache.set("a", 1, ["f1"])
+
+    now[0] += 5
+    assert cache.get("a") == 1
+    now[0] += 6
+    assert cache.get("a") is None
+    assert "f1" not in cache._keys_by_file
+
+
+def test_invalidation_drops_entries_of_any_file():
+    cache = FileScopedCache()
+    cache.set("both", 1, ["f1", "f2"])
+    cache.set("other", 2, ["f3"])
+
+    cache.invalidate_files(["f2"])
+
+    assert cache.get("both") is None
+    assert cache.get("other") == 2
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_stale_result_is_not_stored():
+    cache = FileScopedCache()
+    snapshot = cache.snapshot()
+    cache.invalidate_files(["f1"])
+
+    cache.set("stale", 1, ["f1"], snapshot=snapshot)
+    cache.set("unrelated", 2, ["f2"], snapshot=snapshot)
+    cache.set("fresh", 3, ["f1"], snapshot=cache.snapshot())
+
+    assert cache.get("stale") is None
+    assert cache.get("unrelated") == 2
+    assert cache.get("fresh") == 3
+
+
+def test_forgotten_generations_fall_back_to_floor():
+    cache = FileScopedCache(max_generations=1)
+    before = cache.snapshot()
+    cache.invalidate_files(["f1"])
+    cache.invalidate_files(["f2"])
+
+    # f1's stamp was forgotten, so it counts as invalidated at the floor
+    assert list(cache._generations) == ["f2"]
+    cache.set("old", 1, ["f1"], snapshot=before)
+    assert cache.get("old") is None
+
+    cache.set("new", 2, ["f1"], snapshot=cache.snapshot())
+    assert cache.get("new") == 2
+
+
+def test_clear_rejects_results_computed_before_it():
+    cache = FileScopedCache()
+    cache.set("a", 1, ["f1"])
+    snapshot = cache.snapshot()
+    cache.clear()
+
+    assert cache.get("a") is None
+    cache.set("b", 2, ["f2"], snapshot=snapshot)
+    assert cache.get("b") is None
+    cache.set("c", 3, ["f2"], snapshot=cache.snapshot())
+    assert cache.get("c") == 3
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from ingest_jobs import IngestJobQueue, IngestQueueFull
+
+
+class FakeConnection:
+    """Stands in for asyncpg: records job status updates"""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+
+    async def execute(self, query, *args):
+        # Let concurrent submits interleave, as a real round trip would
+        await asyncio.sleep(0)
+        if "INSERT INTO rag_ingest_jobs" in query:
+            self.statuses[str(args[0])] = 'queued'
+        elif "UPDATE rag_ingest_jobs" in query and "WHERE id = $1" in query:
+            for status in ('running', 'failed', 'done'):
+                if f"status = '{status}'" in query:
+                    self.statuses[str(args[0])] = status
+
+    async def fetchval(self, query, *args):
+        return 0
+
+
+class FakePool:
+    def __init__(self):
+        self.statuses = {}
+
+    def acquire(self):
+        conn = FakeConnection(self.statuses)
+
+        class Acquire:
+            async def __aenter__(self):
+                return conn
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Acquire()
+
+
+def make_queue(**kwargs):
+    pool = FakePool()
+
+    async def pool_getter():
+        return pool
+
+    return IngestJobQueue(pool_getter, **kwargs), pool
+
+
+def test_concurrent_submits_do_not_overshoot_depth():
+    queue, pool = make_queue(workers=1, max_depth=3)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def job():
+            await release.wait()
+            return {}
+
+        results = await asyncio.gather(
+            *(queue.submit(job, f"file-{i}") for i in range(6)), return_exceptions=True
+        )
+        depth = queue.depth
+        release.set()
+        await queue._queue.join()
+        return results, depth
+
+    results, depth = asyncio.run(run())
+
+    assert sum(isinstance(r, str) for r in results) == 3
+    assert sum(isinstance(r, IngestQueueFull) for r in results) == 3
+    assert depth == 3
+    assert queue.stats()['rejected'] == 3
+    assert queue.depth == 0
+
+
+def test_failed_submit_releases_its_slot():
+    queue, pool = make_queue(max_depth=1)
+
+    async def broken_pool():
+        raise ConnectionError("database down")
+
+    queue._pool_getter = broken_pool
+
+    async def job():
+        return {}
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(queue.submit(job, "file"))
+    assert queue.depth == 0
+
+
+def test_job_outcomes_are_recorded():
+    queue, pool = make_queue(workers=2)
+
+    async def ok():
+        return {"chunks": 1}
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    async def run():
+        ok_id = await queue.submit(ok, "a")
+        broken_id = await queue.submit(broken, "b")
+        await queue._queue.join()
+        return ok_id, broken_id
+
+    ok_id, broken_id = asyncio.run(run())
+
+    assert pool.statuses == {ok_id: 'done', broken_id: 'failed'}
+    assert queue.stats()['completed'] == 1
+    assert queue.stats()['failed'] == 1
@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+
+from ingest_pipeline import AdaptiveEmbedder, DigestReuseEmbedder, IngestPipeline
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def chunks(n):
+    return [(f"text {i}", {"i": i}, f"id-{i}") for i in range(n)]
+
+
+def test_rate_limit_halves_limit_and_retries():
+    calls = []
+
+    async def embed_batch(texts):
+        calls.append(list(texts))
+        if len(calls) == 1:
+            raise RateLimited("too many requests")
+        return [[1.0] for _ in texts]
+
+    embedder = AdaptiveEmbedder(embed_batch, max_concurrency=4, base_delay=0)
+    vectors = asyncio.run(embedder.embed(["a", "b"]))
+
+    assert vectors == [[1.0], [1.0]]
+    assert len(calls) == 2
+    assert embedder.limit == 2
+    assert embedder.stats()['rate_limited'] == 1
+    assert embedder.stats()['in_flight'] == 0
+
+
+def test_limit_recovers_after_successes():
+    async def embed_batch(texts):
+        return [[0.0] for _ in texts]
+
+    embedder = AdaptiveEmbedder(embed_batch, max_concurrency=4, recover_after=2)
+    embedder.limit = 1
+
+    async def run():
+        for _ in range(4):
+            await embedder.embed(["a"])
+
+    asyncio.run(run())
+    assert embedder.limit == 3
+
+
+def test_gives_up_after_max_retries():
+    async def embed_batch(texts):
+        raise RateLimited("rate limit")
+
+    embedder = AdaptiveEmbedder(embed_batch, max_retries=2, base_delay=0)
+    with pytest.raises(RateLimited):
+        asyncio.run(embedder.embed(["a"]))
+    assert embedder.stats()['calls'] == 3
+    assert embedder.limit == 1
+
+
+def test_other_errors_are_not_retried():
+    async def embed_batch(texts):
+        raise RuntimeError("boom")
+
+    embedder = AdaptiveEmbedder(embed_batch, base_delay=0)
+    with pytest.raises(RuntimeError):
+        asyncio.run(embedder.embed(["a"]))
+    assert embedder.stats()['calls'] == 1
+    assert embedder.limit == embedder.max_concurrency
+
+
+def test_digest_reuse_embeds_only_missing_unique_texts():
+    embedded = []
+
+    async def lookup(digests):
+        return {"d:known": [9.0]}
+
+    async def embed_batch(texts):
+        embedded.extend(texts)
+        return [[float(len(t))] for t in texts]
+
+    embedder = DigestReuseEmbedder(lookup, embed_batch, lambda text: f"d:{text}")
+    vectors = asyncio.run(embedder.embed(["known", "new", "new", "other"]))
+
+    assert embedded == ["new", "other"]
+    assert vectors == [[9.0], [3.0], [3.0], [5.0]]
+    assert embedder.stats()['reused'] == 2
+
+
+def test_digest_lookup_failure_embeds_everything():
+    async def lookup(digests):
+        raise ConnectionError("down")
+
+    async def embed_batch(texts):
+        return [[1.0] for _ in texts]
+
+    embedder = DigestReuseEmbedder(lookup, embed_batch, str)
+    assert asyncio.run(embedder.embed(["a", "b"])) == [[1.0], [1.0]]
+    assert embedder.stats()['lookup_errors'] == 1
+
+
+def test_pipeline_writes_every_chunk_in_batches():
+    written = []
+
+    async def embed_batch(texts):
+        return [[float(i)] for i, _ in enumerate(texts)]
+
+    async def write_batch(texts, embeddings, metadatas, ids):
+        written.extend(ids)
+        return len(ids)
+
+    pipeline = IngestPipeline(embed_batch, write_batch, batch_size=3, embed_concurrency=2)
+    assert asyncio.run(pipeline.run(chunks(7))) == 7
+    assert sorted(written) == sorted(f"id-{i}" for i in range(7))
+    assert pipeline.stats()['batches'] == 3
+
+
+def test_pipeline_rejects_vector_count_mismatch():
+    async def embed_batch(texts):
+        return [[0.0]] * (len(texts) - 1)
+
+    async def write_batch(texts, embeddings, metadatas, ids):
+        raise AssertionError("must not write misaligned vectors")
+
+    pipeline = IngestPipeline(embed_batch, write_batch, batch_size=2)
+    with pytest.raises(ValueError, match="1 vectors for 2 chunks"):
+        asyncio.run(pipeline.run(chunks(4)))
+
+
+def test_pipeline_failure_cancels_other_stages():
+    cancelled = []
+
+    async def embed_batch(texts):
+        if texts[0] != "text 0":
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(texts[0])
+                raise
+        return [[0.0] for _ in texts]
+
+    async def write_batch(texts, embeddings, metadatas, ids):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("write failed")
+
+    pipeline = IngestPipeline(embed_batch, write_batch, batch_size=1)
+
+    async def run():
+        await asyncio.wait_for(pipeline.run(chunks(5)), timeout=5)
+
+    with pytest.raises(RuntimeError, match="write failed"):
+        asyncio.run(run())
+    assert cancelled == ["text 1"]
@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+from migrations import Migration, MigrationRunner
+
+
+class FakeConnection:
+    """Stands in for asyncpg: keeps rag_schema_migrations rows in a dict"""
+
+    def __init__(self):
+        self.rows = {}
+
+    async def execute(self, query, *args):
+        if "INSERT INTO rag_schema_migrations" in query:
+            name, status, state = args
+            self.rows[name] = {'status': status, 'state': state}
+
+    async def fetchrow(self, query, name):
+        return self.rows.get(name)
+
+    async def fetchval(self, query, *args):
+        return True
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+        self.acquired = 0
+
+    def acquire(self):
+        pool = self
+
+        class Acquire:
+            async def __aenter__(self):
+                pool.acquired += 1
+                return pool.conn
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Acquire()
+
+
+class RecordingMigration(Migration):
+    def __init__(self, name, ran, on_run=None, error=None):
+        super().__init__(name)
+        self.ran = ran
+        self.on_run = on_run
+        self.error = error
+
+    async def run(self, conn, state, save):
+        self.ran.append(self.name)
+        if self.on_run:
+            self.on_run()
+        if self.error:
+            raise self.error
+        state['progress'] = 1
+        await save(state)
+
+
+def make_runner():
+    pool = FakePool()
+
+    async def pool_getter():
+        return pool
+
+    return MigrationRunner(pool_getter, poll_interval=0), pool
+
+
+def test_runs_migrations_and_records_progress():
+    runner, pool = make_runner()
+    ran = []
+    runner.register(RecordingMigration("a", ran))
+    runner.register(RecordingMigration("a", ran))
+    runner.register(RecordingMigration("b", ran))
+
+    asyncio.run(runner._run())
+
+    assert ran == ["a", "b"]
+    assert runner.status == 'ready'
+    assert pool.conn.rows["a"]['status'] == 'done'
+    assert json.loads(pool.conn.rows["a"]['state']) == {'progress': 1}
+
+
+def test_picks_up_migrations_registered_during_a_run():
+    runner, pool = make_runner()
+    ran = []
+    late = RecordingMigration("late", ran)
+    runner.register(RecordingMigration("first", ran, on_run=lambda: runner.register(late)))
+
+    asyncio.run(runner._run())
+
+    assert ran == ["first", "late"]
+    assert runner.is_complete("late")
+    assert pool.acquired == 2
+
+
+def test_failed_migration_does_not_block_others():
+    runner, pool = make_runner()
+    ran = []
+    runner.register(RecordingMigration("broken", ran, error=RuntimeError("boom")))
+    runner.register(RecordingMigration("ok", ran))
+
+    asyncio.run(runner._run())
+
+    assert ran == ["broken", "ok"]
+    assert runner.report()["broken"] == {'status': 'failed', 'error': 'boom'}
+    assert runner.is_complete("ok")
+    assert runner.status == 'failed'
+
+
+def test_completed_migrations_are_skipped():
+    runner, pool = make_runner()
+    pool.conn.rows["a"] = {'status': 'done', 'state': '{}'}
+    ran = []
+    runner.register(RecordingMigration("a", ran))
+
+    asyncio.run(runner._run())
+
+    assert ran == []
+    assert runner.is_complete("a")
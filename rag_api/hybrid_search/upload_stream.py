@@ -0,0 +1,112 @@
+# app/services/upload_stream.py
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Optional
+
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024  # 64 KB
+
+
+class ReceivedUpload:
+    """
+    An upload read once from the request body, with its SHA-256.
+
+    Bodies up to the memory limit stay in `data`; larger ones are spooled
+    to a temporary file at `path`. Call close() to remove the spool file.
+    """
+
+    def __init__(self, filename: str, directory: str):
+        self.filename = filename
+        self.directory = directory
+        self.sha256: Optional[str] = None
+        self.size = 0
+        self.data: Optional[bytes] = None
+        self.path: Optional[str] = None
+
+    def _new_temp_path(self) -> str:
+        # Keep the extension: loaders and encoding detection look at it
+        _, ext = os.path.splitext(self.filename or "")
+        fd, path = tempfile.mkstemp(prefix="upload_", suffix=ext, dir=self.directory)
+        os.close(fd)
+        return path
+
+    def text(self) -> Optional[str]:
+        """The body as UTF-8 text if it is held in memory and decodes cleanly"""
+        if self.data is None:
+            return None
+        try:
+            return self.data.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+
+    async def to_path(self) -> str:
+        """Return a file path with the body, writing it out if held in memory"""
+        if self.path is None:
+            self.path = self._new_temp_path()
+            async with aiofiles.open(self.path, "wb") as out:
+                await out.write(self.data or b"")
+            self.data = None
+        return self.path
+
+    async def close(self):
+        """Remove the spool file, if any"""
+        if self.path is not None:
+            try:
+                await aiofiles.os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Failed to remove temporary upload file {self.path}: {e}")
+            self.path = None
+        self.data = None
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file on disk, read in chunks (blocking: run it in an executor)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def receive_upload(file: UploadFile, directory: str, memory_limit: int) -> ReceivedUpload:
+    """Read an upload in chunks, hashing it and spooling to disk past `memory_limit` bytes"""
+    upload = ReceivedUpload(file.filename, directory)
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    out = None
+
+    try:
+        while chunk := await file.read(READ_CHUNK_SIZE):
+            digest.update(chunk)
+            upload.size += len(chunk)
+            if out is None and len(buffer) + len(chunk) <= memory_limit:
+                buffer.extend(chunk)
+                continue
+            if out is None:
+                upload.path = upload._new_temp_path()
+                out = await aiofiles.open(upload.path, "wb")
+                await out.write(bytes(buffer))
+                buffer = bytearray()
+            await out.write(chunk)
+    except Exception:
+        if out is not None:
+            await out.close()
+        await upload.close()
+        raise
+
+    if out is not None:
+        await out.close()
+    else:
+        upload.data = bytes(buffer)
+
+    upload.sha256 = digest.hexdigest()
+    return upload